@@ -0,0 +1,141 @@
+"""
+Helpers shared by the benchmarks: running against the app sources in src/,
+latency summaries, peak RSS sampling and the JSON report.
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(REPO_ROOT, "src")
+
+
+def use_app_sources():
+    """
+    Make the app modules importable as they are under `streamlit run app.py`:
+    src/ on sys.path and as the working directory, where config.yaml is read from.
+    """
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+    os.chdir(SRC_DIR)
+
+
+def configure_app(configs):
+    """Apply config.yaml the way app.main does (call after use_app_sources)."""
+    from chat_management.chat_history import ChatHistory
+    from chat_management.prompt_builder import PromptBuilder
+    from chat_management.response_cache import SemanticResponseCache
+    from chat_management.retrieval_stage import RetrievalStage
+    from embeddings.model_registry import ModelRegistry
+    from model_services.dispatcher import InferenceDispatcher
+    from utils.document_parser import DocumentParser
+    from utils.executors import Executors
+    from utils.telemetry import Telemetry
+    from vector_db.redis_manager import RedisManager
+
+    ModelRegistry.configure(configs.get('models'))
+    RedisManager.configure_pool(configs['redis'].get('pool'))
+    Telemetry.configure(configs.get('telemetry'))
+    Executors.configure(configs.get('executors'))
+    DocumentParser.configure(configs.get('ingestion'))
+    ChatHistory.configure(configs.get('chat_history'))
+    SemanticResponseCache.configure(configs.get('response_cache'))
+    InferenceDispatcher.configure(configs.get('dispatcher'))
+    PromptBuilder.configure(configs.get('prompt'))
+    RetrievalStage.configure(configs.get('retrieval'))
+
+
+def redis_url_for(configs, override=None):
+    """The Redis to use: --redis-url, then $REDIS_URL, then the `redis` section of config.yaml."""
+    from vector_db.redis_manager import RedisManager
+    return override or os.getenv("REDIS_URL") or RedisManager.build_redis_connection_url(configs['redis'])
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class PeakRss:
+    """Samples this process's RSS in a background thread while the block runs."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_mb = current_rss_mb()
+        self._thread = threading.Thread(target=self._sample, name="rss-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+        return False
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an ascending list, as numpy.percentile computes it."""
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(latencies, wall_seconds, items=None):
+    """
+    Latency percentiles (ms) of the timed operations and throughput over the
+    wall time; `items` counts units of work when an operation covers several.
+    """
+    if not latencies:
+        return {'count': 0}
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    items = len(latencies_ms) if items is None else items
+    return {
+        'count': len(latencies_ms),
+        'items': items,
+        'wall_seconds': round(wall_seconds, 4),
+        'throughput_per_second': round(items / wall_seconds, 3) if wall_seconds else None,
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3),
+        'p50_ms': round(percentile(latencies_ms, 0.50), 3),
+        'p95_ms': round(percentile(latencies_ms, 0.95), 3),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 3),
+        'max_ms': round(latencies_ms[-1], 3),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report, output=None):
+    """Print the report as JSON, or write it to `output` (a path resolved before use_app_sources changed directory)."""
+    report = {'revision': git_revision(), 'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"), **report}
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as report_file:
+            report_file.write(text + "\n")
+    else:
+        print(text)
+    return report
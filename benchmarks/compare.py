@@ -0,0 +1,56 @@
+"""
+Compare two benchmark reports, e.g. from the commits before and after a change:
+
+    python -m benchmarks.compare before.json after.json --threshold 10
+
+Exits with status 1 when any latency, throughput or memory figure got worse
+by more than `--threshold` percent.
+"""
+import argparse
+import json
+
+# metric -> True when a higher value is better
+METRICS = {
+    'throughput_per_second': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+    'peak_rss_mb': False,
+}
+
+
+def compare(before, after, threshold):
+    """Return the table rows (stage, metric, before, after, change %, regressed) for stages present in both reports."""
+    rows = []
+    for stage, new in after['stages'].items():
+        old = before['stages'].get(stage)
+        if not old or 'skipped' in old or 'skipped' in new:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if old.get(metric) is None or new.get(metric) is None:
+                continue
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            worse = -change if higher_is_better else change
+            rows.append((stage, metric, old[metric], new[metric], change, worse > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=10, help="percent change counted as a regression")
+    args = parser.parse_args()
+    with open(args.before) as before_file, open(args.after) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+
+    print(f"{before.get('revision')} -> {after.get('revision')}")
+    rows = compare(before, after, args.threshold)
+    for stage, metric, old, new, change, regressed in rows:
+        print(f"{stage:<12} {metric:<22} {old:>12.3f} {new:>12.3f} {change:>+8.1f}%{'  REGRESSION' if regressed else ''}")
+    if any(row[-1] for row in rows):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
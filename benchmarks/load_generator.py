@@ -0,0 +1,321 @@
+"""
+Load test of the comparison flow. Each simulated session does what
+process_authenticated_user_flow does for a browser session: upload a PDF,
+index it (or attach to the index another session already built for the same
+file), then ask a series of questions that every architecture answers
+concurrently. The architectures in config.yaml are pointed at stub
+OpenAI-compatible servers (one per endpoint) with scripted time to first
+token, token rate and batch limit; embedding, Redis, retrieval, reranking,
+prompt assembly, the inference dispatcher and the chat history are real.
+
+Sessions run in their own threads and every question in its own event loop,
+as Streamlit runs each rerun. The sweep runs one step per concurrency level
+and reports, per step, sustained queries/sec, queueing delay and p50/p95/p99
+latency as JSON:
+
+    python -m benchmarks.load_generator --sessions 1,8,32,64 --turns 5 \\
+        --redis-url redis://:testing123@localhost:6379 -o load.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+import random
+import threading
+import time
+
+from benchmarks.common import PeakRss, configure_app, redis_url_for, summarize, use_app_sources, write_report
+from benchmarks.stub_llm_server import StubLLMServer
+from benchmarks.synthetic_pdf import SyntheticUpload, make_pages, make_pdf, make_queries
+
+
+class StepRecorder:
+    """Timings and failures of one concurrency step, appended to from every session thread."""
+
+    def __init__(self):
+        self.samples = {'setup': [], 'turn': [], 'retrieval_wait': [], 'ttft': [], 'generation': []}
+        self.counts = {'turns': 0, 'columns': 0, 'timeouts': 0, 'errors': 0, 'cache_hits': 0}
+        self.errors = {}
+        self.first_turn_started = None
+        self.last_turn_finished = None
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.samples[name].append(seconds)
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def error(self, where, exception):
+        with self._lock:
+            self.counts['errors'] += 1
+            key = f"{where}: {type(exception).__name__}: {exception}"[:200]
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def turn(self, started, finished):
+        with self._lock:
+            self.samples['turn'].append(finished - started)
+            self.counts['turns'] += 1
+            self.first_turn_started = min(started, self.first_turn_started or started)
+            self.last_turn_finished = max(finished, self.last_turn_finished or finished)
+
+    def query_window(self):
+        """Seconds from the first question asked to the last one answered."""
+        if self.first_turn_started is None:
+            return 0.0
+        return self.last_turn_finished - self.first_turn_started
+
+
+class LoadGenerator:
+    def __init__(self, args):
+        # Imported here, once the app sources are on sys.path
+        from config_manager import ConfigManager
+
+        self.args = args
+        self.configs = ConfigManager.load_config_details()
+        configure_app(self.configs)
+        self.redis_url = redis_url_for(self.configs, args.redis_url)
+        token_interval_ms = 1000 / args.tokens_per_second if args.tokens_per_second else 0
+        # One stub per endpoint, so architectures sharing a server share its batch limit and dispatcher slots
+        self.stubs = {}
+        self.model_configs = []
+        for config in ConfigManager.get_model_configs():
+            stub = self.stubs.get(config.endpoint)
+            if stub is None:
+                stub = StubLLMServer(ttft_ms=args.ttft_ms, tokens=args.tokens, token_interval_ms=token_interval_ms,
+                                     max_concurrency=args.stub_max_concurrency)
+                self.stubs[config.endpoint] = stub
+            self.model_configs.append(config)
+        self.documents = [
+            SyntheticUpload(make_pdf(make_pages(args.pages, args.words_per_page, args.seed + i)), name=f"loadtest-{args.seed + i}.pdf")
+            for i in range(args.distinct_documents)
+        ]
+        page_texts = make_pages(args.pages, args.words_per_page, args.seed)
+        self.questions = make_queries(page_texts, max(args.question_pool, 100), args.seed)
+        self.chatbots = []
+        self.existing_indexes = None
+
+    def start_stubs(self):
+        # Every architecture is served as an OpenAI-compatible "instruct" model by its stub
+        for stub in self.stubs.values():
+            stub.start()
+        self.model_configs = [dataclasses.replace(config, type="instruct", endpoint=self.stubs[config.endpoint].url,
+                                                  model_name=config.model_name or "stub")
+                              for config in self.model_configs]
+
+    def stop_stubs(self):
+        for stub in self.stubs.values():
+            stub.stop()
+
+    def question(self, rng, session_id, turn):
+        """A question from the shared pool (repeats coalesce and hit the response cache), or a distinct one."""
+        if self.args.question_pool:
+            return rng.choice(self.questions[:self.args.question_pool])
+        return f"{rng.choice(self.questions)} ({session_id}, turn {turn})"
+
+    async def column(self, chatbot, query, model_config, retrieval, recorder):
+        """One architecture's answer, through the same Chatbot.answer the app renders from."""
+        from model_services.model_factory import ModelFactory
+
+        llm = ModelFactory.get_inference_model(model_config)
+        answer = await chatbot.answer(query, model_config, retrieval, llm)
+        if answer.cached is not None:
+            recorder.count('cache_hits')
+            return answer.text
+        for name in ('retrieval_wait', 'ttft', 'generation'):
+            seconds = getattr(answer, name)
+            if seconds is not None:
+                recorder.add(name, seconds)
+        return answer.text
+
+    async def run_column(self, chatbot, query, model_config, retrieval, recorder):
+        recorder.count('columns')
+        try:
+            return await asyncio.wait_for(self.column(chatbot, query, model_config, retrieval, recorder),
+                                          timeout=model_config.timeout)
+        except asyncio.TimeoutError:
+            recorder.count('timeouts')
+        except Exception as e:
+            recorder.error(model_config.id, e)
+        return None
+
+    async def ask(self, chatbot, query, recorder):
+        """One question answered by every architecture, as manage_responses runs it."""
+        started = time.perf_counter()
+        recent_messages = chatbot.history.recent_messages()
+        for config in self.model_configs:
+            chatbot.history.messages_for(config.id, recent_messages)
+        retrieval = chatbot.retrieval_stage(query, self.model_configs)
+        try:
+            answers = await asyncio.gather(*(self.run_column(chatbot, query, config, retrieval, recorder)
+                                             for config in self.model_configs))
+        finally:
+            retrieval.cancel()
+        chatbot.history.append_turn(query, {config.id: answer for config, answer in zip(self.model_configs, answers)})
+        recorder.turn(started, time.perf_counter())
+
+    def session(self, step, session_index, recorder, start_barrier):
+        from chat_management.chatbot import Chatbot
+        from utils.document_parser import DocumentParser
+        from utils.executors import Executors
+
+        session_id = f"loadtest-{step}-{session_index}"
+        rng = random.Random(f"{self.args.seed}-{session_id}")
+        upload = self.documents[session_index % len(self.documents)]
+        start_barrier.wait()
+        # Stagger arrivals over the ramp-up, rather than everyone uploading in the same millisecond
+        time.sleep(rng.uniform(0, self.args.ramp_up_seconds))
+        started = time.perf_counter()
+        try:
+            parsed_document = Executors.cpu().call(DocumentParser.parse, upload)
+            chatbot = Chatbot.from_document(parsed_document, self.redis_url, "chat_history", session_id)
+            if chatbot is None:
+                raise RuntimeError("no retriever for the document")
+        except Exception as e:
+            recorder.error("setup", e)
+            return
+        recorder.add('setup', time.perf_counter() - started)
+        self.chatbots.append(chatbot)
+        for turn in range(self.args.turns):
+            try:
+                asyncio.run(self.ask(chatbot, self.question(rng, session_id, turn), recorder))
+            except Exception as e:
+                recorder.error("turn", e)
+            if self.args.think_seconds:
+                time.sleep(rng.expovariate(1 / self.args.think_seconds))
+
+    def step(self, step, sessions):
+        """Run `sessions` concurrent sessions to completion and summarize them."""
+        from model_services.dispatcher import InferenceDispatcher
+        from utils.executors import Executors
+
+        recorder = StepRecorder()
+        for stub in self.stubs.values():
+            stub.reset_stats()
+        dispatcher_before = InferenceDispatcher.stats()
+        start_barrier = threading.Barrier(sessions + 1)
+        threads = [threading.Thread(target=self.session, args=(step, i, recorder, start_barrier), name=f"session-{i}", daemon=True)
+                   for i in range(sessions)]
+        for thread in threads:
+            thread.start()
+        with PeakRss() as rss:
+            start_barrier.wait()
+            started = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+
+        window = recorder.query_window()
+        turns = recorder.counts['turns']
+        report = {
+            'sessions': sessions,
+            'wall_seconds': round(wall, 3),
+            'queries_per_second': round(turns / window, 3) if window else 0.0,
+            'counts': recorder.counts,
+            'setup': summarize(recorder.samples['setup'], wall),
+            'turn_latency': summarize(recorder.samples['turn'], window),
+            'retrieval_wait': summarize(recorder.samples['retrieval_wait'], window),
+            'time_to_first_token': summarize(recorder.samples['ttft'], window),
+            'generation': summarize(recorder.samples['generation'], window),
+            'queueing': {
+                'dispatcher': self.dispatcher_waits(dispatcher_before, InferenceDispatcher.stats()),
+                'stub_servers': summarize([wait for stub in self.stubs.values() for wait in stub.queue_waits], window),
+                'executors': Executors.stats(),
+            },
+            'peak_rss_mb': round(rss.peak_mb, 1),
+        }
+        if recorder.errors:
+            report['errors'] = recorder.errors
+        return report
+
+    @staticmethod
+    def dispatcher_waits(before, after):
+        """Average wait for a dispatcher slot per endpoint during the step (the maximum is since start-up)."""
+        waits = {}
+        for endpoint, counters in after.items():
+            previous = before.get(endpoint, {})
+            started = counters['started'] - previous.get('started', 0)
+            total_ms = counters['queue_wait_total_ms'] - previous.get('queue_wait_total_ms', 0.0)
+            waits[endpoint] = {
+                'requests': counters['requests'] - previous.get('requests', 0),
+                'coalesced': counters['coalesced'] - previous.get('coalesced', 0),
+                'queue_wait_avg_ms': round(total_ms / started, 3) if started else 0.0,
+                'queue_wait_max_ms': round(counters['queue_wait_max_ms'], 3),
+            }
+        return waits
+
+    def record_existing_indexes(self):
+        from vector_db.index_registry import IndexRegistry
+        client = IndexRegistry(self.redis_url).client
+        self.existing_indexes = {name.decode() for name in client.zrange(IndexRegistry.REGISTRY_KEY, 0, -1)}
+
+    def cleanup(self):
+        """Drop the sessions' chat histories and leases, and the indexes this run created."""
+        from vector_db.index_registry import IndexRegistry
+        created = set()
+        for chatbot in self.chatbots:
+            try:
+                chatbot.history.reset()
+                chatbot.index_registry.release(chatbot.index_name, chatbot.session_id)
+            except Exception as e:
+                print(f"Could not clean up session {chatbot.session_id}: {e}")
+            if self.existing_indexes is not None and chatbot.index_name not in self.existing_indexes:
+                created.add(chatbot.index_name)
+        registry = IndexRegistry(self.redis_url)
+        for index_name in created:
+            if not registry.drop(index_name):
+                print(f"Could not drop load test index {index_name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", default="1,4,16,32", help="comma-separated concurrency levels, run in order")
+    parser.add_argument("--turns", type=int, default=5, help="questions per session")
+    parser.add_argument("--think-seconds", type=float, default=2, help="mean pause between a session's questions (exponential)")
+    parser.add_argument("--ramp-up-seconds", type=float, default=5, help="sessions arrive uniformly over this window")
+    parser.add_argument("--question-pool", type=int, default=0,
+                        help="draw questions from a pool of this size, so sessions repeat each other (0: every question distinct, "
+                             "though near-duplicates can still hit the response cache if it is enabled)")
+    parser.add_argument("--distinct-documents", type=int, default=1, help="sessions upload one of this many different PDFs")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--ttft-ms", type=float, default=300, help="stub time to first token")
+    parser.add_argument("--tokens", type=int, default=128, help="tokens per stub completion")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="stub token rate per completion (0: as fast as possible)")
+    parser.add_argument("--stub-max-concurrency", type=int, default=8,
+                        help="completions each stub serves at once, like a GPU server's batch limit (0: unlimited)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", help="Redis Stack to use (default: $REDIS_URL, then config.yaml)")
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.sessions.split(",") if level.strip()]
+    if not levels or min(levels) < 1 or args.distinct_documents < 1:
+        parser.error("--sessions and --distinct-documents need positive values")
+    output = os.path.abspath(args.output) if args.output else None
+    use_app_sources()
+
+    load = LoadGenerator(args)
+    from vector_db.redis_manager import RedisManager
+    try:
+        RedisManager.get_client(load.redis_url).ping()
+    except Exception as e:
+        parser.error(f"Redis not reachable at {load.redis_url}: {e}")
+    load.record_existing_indexes()
+    load.start_stubs()
+    steps = []
+    try:
+        for step, sessions in enumerate(levels):
+            print(f"Running {sessions} concurrent sessions...", flush=True)
+            steps.append(load.step(step, sessions))
+    finally:
+        load.stop_stubs()
+        load.cleanup()
+    params = {key: value for key, value in vars(args).items() if key not in ('output', 'redis_url')}
+    write_report({'params': params, 'architectures': [config.id for config in load.model_configs], 'steps': steps}, output)
+
+
+if __name__ == "__main__":
+    main()
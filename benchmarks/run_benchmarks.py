@@ -0,0 +1,256 @@
+"""
+Headless benchmarks of the chat pipeline, stage by stage, with the app's own
+classes and config.yaml but without Streamlit:
+
+    parse       DocumentParser on synthetic PDFs
+    embed       embedding the document's chunks (models.embedding_backend)
+    ingest      DocEmbedding into a Redis Stack index, skipped without Redis
+    retrieval   RetrievalStage (KNN, full-text and fusion), skipped without Redis
+    rerank      FlashrankRerank over the retrieved (or split) chunks
+    prompt      PromptBuilder packing the chunks into the context budget
+    generation  streaming through InferenceDispatcher from a stub OpenAI server
+
+Each stage reports throughput, p50/p95/p99 latency and peak RSS as JSON, so
+runs on two commits can be compared with benchmarks/compare.py:
+
+    python -m benchmarks.run_benchmarks --pages 50 --iterations 5 -o before.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import os
+import time
+
+from benchmarks.common import PeakRss, configure_app, redis_url_for, summarize, use_app_sources, write_report
+from benchmarks.stub_llm_server import StubLLMServer
+from benchmarks.synthetic_pdf import SyntheticUpload, make_pages, make_pdf, make_queries
+
+STAGES = ("parse", "embed", "ingest", "retrieval", "rerank", "prompt", "generation")
+
+
+class StageSkipped(Exception):
+    """A stage's dependency (e.g. Redis Stack) is not available."""
+
+
+class BenchmarkRun:
+    def __init__(self, args):
+        # Imported here, once the app sources are on sys.path
+        from config_manager import ConfigManager
+        from embeddings.model_registry import ModelRegistry
+        from model_services.model_config import ModelConfig
+
+        self.args = args
+        self.configs = ConfigManager.load_config_details()
+        configure_app(self.configs)
+        self.model_configs = ConfigManager.get_model_configs()
+        self.rag_config = next((config for config in self.model_configs if config.uses_rag),
+                               ModelConfig(name="benchmark", description="", endpoint=None, uses_rag=True))
+        self.redis_url = redis_url_for(self.configs, args.redis_url)
+        self.embedding_backend = ModelRegistry.embedding_id()
+        self.page_texts = make_pages(args.pages, args.words_per_page, args.seed)
+        self.queries = make_queries(self.page_texts, args.queries, args.seed)
+        self.parsed = None
+        self.chunks = None
+        self.index_names = []
+        self.retrieved = {}
+
+    def require_redis(self):
+        from vector_db.redis_manager import RedisManager
+        try:
+            RedisManager.get_client(self.redis_url).ping()
+        except Exception as e:
+            raise StageSkipped(f"Redis not reachable at {self.redis_url}: {e}")
+
+    def document(self, seed):
+        """A fresh synthetic PDF per seed, so the parser's content-hash cache never hits."""
+        return SyntheticUpload(make_pdf(make_pages(self.args.pages, self.args.words_per_page, seed)), name=f"synthetic-{seed}.pdf")
+
+    def split_chunks(self):
+        if self.chunks is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            from embeddings.doc_embedding import DocEmbedding
+            from embeddings.ingestion_pipeline import IngestionPipeline
+            from utils.document_parser import DocumentParser
+
+            parsed = self.parsed or DocumentParser.parse(self.document(self.args.seed))
+            # Split exactly as ingestion does
+            splitter = RecursiveCharacterTextSplitter(chunk_size=DocEmbedding.CHUNK_SIZE, chunk_overlap=DocEmbedding.CHUNK_OVERLAP, add_start_index=True)
+            self.chunks = list(IngestionPipeline(splitter, None, self.configs.get('ingestion')).chunks(parsed.iter_pages(), parsed.name))
+        return self.chunks
+
+    def candidates(self, query_index):
+        """Documents a query's rerank and prompt stages work on: what retrieval found, else a window of chunks."""
+        if query_index in self.retrieved:
+            return self.retrieved[query_index]
+        chunks = self.split_chunks()
+        start = (query_index * self.args.top_k) % max(len(chunks) - self.args.top_k, 1)
+        return chunks[start:start + self.args.top_k]
+
+    def stage_parse(self):
+        from utils.document_parser import DocumentParser
+        latencies = []
+        uploads = [self.document(self.args.seed + i) for i in range(self.args.iterations)]
+        for upload in uploads:
+            started = time.perf_counter()
+            parsed = DocumentParser.parse(upload)
+            latencies.append(time.perf_counter() - started)
+        self.parsed = parsed
+        return latencies, self.args.pages * len(uploads), {'unit': "pages"}
+
+    def stage_embed(self):
+        from embeddings.model_registry import ModelRegistry
+        embeddings = ModelRegistry.get_embeddings()
+        texts = [chunk.page_content for chunk in self.split_chunks()]
+        batch_size = (self.configs.get('ingestion') or {}).get('embed_batch_size', 64)
+        latencies = []
+        for _ in range(self.args.iterations):
+            for start in range(0, len(texts), batch_size):
+                started = time.perf_counter()
+                embeddings.embed_documents(texts[start:start + batch_size])
+                latencies.append(time.perf_counter() - started)
+        return latencies, len(texts) * self.args.iterations, {'unit': "chunks", 'batch_size': batch_size, 'backend': self.embedding_backend}
+
+    def stage_ingest(self):
+        from embeddings.doc_embedding import DocEmbedding
+        from utils.document_parser import DocumentParser
+        self.require_redis()
+        # No embedding cache, so every iteration pays for the full encode
+        doc_embedding = DocEmbedding(None, self.configs.get('ingestion'), self.configs.get('vector_index'))
+        latencies = []
+        for i in range(self.args.iterations):
+            parsed = DocumentParser.parse(self.document(self.args.seed + i))
+            index_name = f"{doc_embedding.index_name_for(parsed)}_bench"
+            started = time.perf_counter()
+            doc_embedding.create_doc_embedding(parsed, self.redis_url, index_name)
+            latencies.append(time.perf_counter() - started)
+            self.index_names.append(index_name)
+        return latencies, self.args.pages * self.args.iterations, {'unit': "pages"}
+
+    async def stage_retrieval(self):
+        from chat_management.retrieval_stage import RetrievalStage
+        from embeddings.doc_embedding import DocEmbedding
+        self.require_redis()
+        if not self.index_names:
+            raise StageSkipped("needs the ingest stage")
+        retriever = DocEmbedding(None, self.configs.get('ingestion'), self.configs.get('vector_index')).get_doc_retriever(self.redis_url, self.index_names[0])
+        latencies = []
+        for i, query in enumerate(self.queries):
+            stage = RetrievalStage(retriever, query, rerank=False, model_configs=self.model_configs)
+            started = time.perf_counter()
+            result = await stage.run()
+            latencies.append(time.perf_counter() - started)
+            self.retrieved[i] = result.docs[:self.args.top_k]
+        return latencies, len(self.queries), {'unit': "queries", 'mode': RetrievalStage.settings['mode']}
+
+    def stage_rerank(self):
+        from embeddings.model_registry import ModelRegistry
+        reranker = ModelRegistry.get_reranker()
+        latencies = []
+        for i, query in enumerate(self.queries):
+            docs = self.candidates(i)
+            started = time.perf_counter()
+            reranker.compress_documents(docs, query)
+            latencies.append(time.perf_counter() - started)
+        return latencies, len(self.queries), {'unit': "queries", 'documents_per_query': self.args.top_k}
+
+    def stage_prompt(self):
+        from chat_management.prompt_builder import PromptBuilder
+        latencies = []
+        packed = []
+        for i, query in enumerate(self.queries):
+            docs = self.candidates(i)
+            started = time.perf_counter()
+            prompt = PromptBuilder.build(query, docs, self.rag_config)
+            latencies.append(time.perf_counter() - started)
+            packed.append(prompt.doc_tokens)
+        return latencies, len(self.queries), {'unit': "queries", 'context_token_budget': self.rag_config.context_token_budget,
+                                              'mean_doc_tokens': round(sum(packed) / len(packed), 1) if packed else 0}
+
+    async def stage_generation(self):
+        from model_services.dispatcher import InferenceDispatcher
+        from model_services.model_factory import ModelFactory
+        server = StubLLMServer(ttft_ms=self.args.stub_ttft_ms, tokens=self.args.stub_tokens,
+                               token_interval_ms=self.args.stub_token_interval_ms).start()
+        try:
+            model_config = dataclasses.replace(self.rag_config, type="instruct", endpoint=server.url, model_name="stub")
+            llm = ModelFactory.get_inference_model(model_config)
+            latencies = []
+            first_tokens = []
+            for i, query in enumerate(self.queries):
+                # Distinct prompts, so the dispatcher never coalesces them
+                prompt = f"{i}: {query}"
+                started = time.perf_counter()
+                first_token = None
+                async for _ in InferenceDispatcher.stream(model_config, llm, prompt):
+                    if first_token is None:
+                        first_token = time.perf_counter() - started
+                latencies.append(time.perf_counter() - started)
+                first_tokens.append(first_token or latencies[-1])
+        finally:
+            server.stop()
+        ttft = summarize(first_tokens, sum(first_tokens))
+        overhead = {key: round(ttft[key] - self.args.stub_ttft_ms, 3) for key in ('p50_ms', 'p95_ms', 'p99_ms')}
+        return latencies, len(self.queries), {'unit': "completions", 'ttft': ttft, 'ttft_overhead': overhead, 'stub': server.stats()}
+
+    def cleanup(self):
+        from vector_db.redis_manager import RedisManager
+        for index_name in self.index_names:
+            try:
+                RedisManager.get_client(self.redis_url).ft(index_name).dropindex(delete_documents=True)
+            except Exception as e:
+                print(f"Could not drop benchmark index {index_name}: {e}")
+
+    async def run(self, stages):
+        results = {}
+        for name in stages:
+            stage = getattr(self, f"stage_{name}")
+            with PeakRss() as rss:
+                started = time.perf_counter()
+                try:
+                    outcome = stage()
+                    if asyncio.iscoroutine(outcome):
+                        outcome = await outcome
+                except StageSkipped as e:
+                    results[name] = {'skipped': str(e)}
+                    continue
+                wall = time.perf_counter() - started
+            latencies, items, extra = outcome
+            results[name] = {**summarize(latencies, wall, items), **extra, 'peak_rss_mb': round(rss.peak_mb, 1)}
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ", ".join(STAGES))
+    parser.add_argument("--pages", type=int, default=20, help="pages per synthetic PDF")
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--iterations", type=int, default=3, help="documents parsed/ingested and embedding passes")
+    parser.add_argument("--queries", type=int, default=20, help="queries for the retrieval, rerank, prompt and generation stages")
+    parser.add_argument("--top-k", type=int, default=10, help="documents per query handed to the reranker and prompt builder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--redis-url", help="Redis Stack to ingest into (default: $REDIS_URL, then config.yaml)")
+    parser.add_argument("--stub-ttft-ms", type=float, default=50)
+    parser.add_argument("--stub-tokens", type=int, default=64)
+    parser.add_argument("--stub-token-interval-ms", type=float, default=5)
+    parser.add_argument("-o", "--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    output = os.path.abspath(args.output) if args.output else None
+    use_app_sources()
+
+    run = BenchmarkRun(args)
+    try:
+        results = asyncio.run(run.run([stage for stage in STAGES if stage in stages]))
+    finally:
+        run.cleanup()
+    params = {key: value for key, value in vars(args).items() if key not in ('output', 'redis_url')}
+    write_report({'params': params, 'embedding_backend': run.embedding_backend, 'stages': results}, output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+OpenAI-compatible completion server with scripted timing, standing in for the
+vLLM / llama.cpp endpoints in benchmarks and load tests.
+
+Every completion waits `ttft_ms`, then streams `tokens` chunks `token_interval_ms`
+apart as server-sent events, like `/v1/chat/completions` with `stream: true`.
+At most `max_concurrency` completions are served at once (0 = unlimited), to
+mimic a GPU server's batch limit; the rest queue.
+
+    python -m benchmarks.stub_llm_server --port 8001 --ttft-ms 150 --tokens 128
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+import uuid
+
+from aiohttp import web
+
+
+class StubLLMServer:
+    def __init__(self, host="127.0.0.1", port=0, ttft_ms=100, tokens=64, token_interval_ms=10, max_concurrency=0):
+        self.host = host
+        self.port = port
+        self.ttft = ttft_ms / 1000
+        self.tokens = tokens
+        self.token_interval = token_interval_ms / 1000
+        self.max_concurrency = max_concurrency
+        self.requests = 0
+        self.max_in_flight = 0
+        self.queue_waits = []  # seconds each completion waited for a slot
+        self._in_flight = 0
+        self._slots = None
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @property
+    def url(self):
+        """Base URL to use as an architecture's endpoint."""
+        return f"http://{self.host}:{self.port}/v1/"
+
+    def app(self):
+        """The aiohttp application; also what `main` serves standalone."""
+        if self.max_concurrency:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        app = web.Application()
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/v1/completions", self.chat_completions)
+        return app
+
+    async def models(self, request):
+        return web.json_response({'object': "list", 'data': [{'id': "stub", 'object': "model"}]})
+
+    def _chunk(self, completion_id, model, content=None, finish_reason=None):
+        delta = {'content': content} if content is not None else {}
+        return {'id': completion_id, 'object': "chat.completion.chunk", 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]}
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        model = body.get('model', "stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        self.requests += 1
+        arrived = time.perf_counter()
+        if self._slots is not None:
+            await self._slots.acquire()
+        self.queue_waits.append(time.perf_counter() - arrived)
+        self._in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            await asyncio.sleep(self.ttft)
+            words = [f"token{i} " for i in range(self.tokens)]
+            if not body.get('stream'):
+                await asyncio.sleep(self.token_interval * max(self.tokens - 1, 0))
+                return web.json_response({
+                    'id': completion_id, 'object': "chat.completion", 'created': int(time.time()), 'model': model,
+                    'choices': [{'index': 0, 'message': {'role': "assistant", 'content': "".join(words)}, 'finish_reason': "stop"}],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': self.tokens, 'total_tokens': self.tokens},
+                })
+            response = web.StreamResponse(headers={'Content-Type': "text/event-stream", 'Cache-Control': "no-cache"})
+            await response.prepare(request)
+            await response.write(f"data: {json.dumps(self._chunk(completion_id, model, ''))}\n\n".encode())
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self.token_interval)
+                await response.write(f"data: {json.dumps(self._chunk(completion_id, model, word))}\n\n".encode())
+            await response.write(f"data: {json.dumps(self._chunk(completion_id, model, finish_reason='stop'))}\n\n".encode())
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+            return response
+        finally:
+            self._in_flight -= 1
+            if self._slots is not None:
+                self._slots.release()
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def _serve(self):
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        """Serve from a daemon thread; returns once the port is bound."""
+        self._thread = threading.Thread(target=self._serve, name="stub-llm-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def stats(self):
+        return {'requests': self.requests, 'max_in_flight': self.max_in_flight}
+
+    def reset_stats(self):
+        """Start counting afresh, e.g. for the next step of a load test."""
+        self.requests = 0
+        self.max_in_flight = self._in_flight
+        self.queue_waits = []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttft-ms", type=float, default=100)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--token-interval-ms", type=float, default=10)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    args = parser.parse_args()
+    server = StubLLMServer(args.host, args.port, args.ttft_ms, args.tokens, args.token_interval_ms, args.max_concurrency)
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Deterministic synthetic documents for the benchmarks: page texts made of a
+fixed vocabulary plus identifiers (error codes, CLI flags) that exercise the
+full-text search, written out as a plain PDF without extra dependencies.
+
+    python -m benchmarks.synthetic_pdf --pages 50 -o /tmp/synthetic.pdf
+"""
+import argparse
+import random
+
+WORDS = (
+    "cluster node pod container image registry route service deployment replica "
+    "model adapter taxonomy skill knowledge training checkpoint granite merlinite "
+    "vector index embedding retrieval rerank prompt token latency throughput cache "
+    "redis stream endpoint timeout session upload document page chunk overlap "
+    "configure install upgrade rollback monitor alert quota storage network policy"
+).split()
+LINE_CHARS = 90
+
+
+def make_identifier(rng):
+    kind = rng.randrange(3)
+    if kind == 0:
+        return f"ERR-{rng.randrange(1000, 9999)}"
+    if kind == 1:
+        return f"--{rng.choice(WORDS)}-{rng.choice(WORDS)}"
+    return f"RHEL-{rng.randrange(100, 999)}.{rng.randrange(10)}"
+
+
+def make_pages(pages, words_per_page=400, seed=0):
+    """Return `pages` page texts of sentences; one word in forty is an identifier."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(pages):
+        sentences = []
+        words = 0
+        while words < words_per_page:
+            length = rng.randrange(8, 20)
+            sentence = [make_identifier(rng) if rng.random() < 0.025 else rng.choice(WORDS) for _ in range(length)]
+            sentences.append(" ".join(sentence).capitalize() + ".")
+            words += length
+        texts.append(" ".join(sentences))
+    return texts
+
+
+def make_queries(page_texts, count, seed=0):
+    """Questions about the generated text: half name an identifier from it, half only use vocabulary words."""
+    rng = random.Random(seed)
+    identifiers = sorted({word.strip(".") for text in page_texts for word in text.split()
+                          if word.startswith(("ERR-", "--", "RHEL-"))})
+    queries = []
+    for i in range(count):
+        topic = " ".join(rng.sample(WORDS, 3))
+        if identifiers and i % 2 == 0:
+            queries.append(f"What does {rng.choice(identifiers)} mean for the {topic}?")
+        else:
+            queries.append(f"How do I {rng.choice(WORDS)} the {topic}?")
+    return queries
+
+
+def _wrap(text):
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > LINE_CHARS:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def _escape(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(page_texts):
+    """Write page texts as a PDF (Helvetica, one text object per page) and return its bytes."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in page_texts:
+        lines = _wrap(text)
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(output)
+
+
+class SyntheticUpload:
+    """Stands in for a Streamlit UploadedFile."""
+
+    def __init__(self, data, name="synthetic.pdf", file_type="application/pdf"):
+        self.data = data
+        self.name = name
+        self.type = file_type
+
+    def getvalue(self):
+        return self.data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--words-per-page", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+    with open(args.output, "wb") as pdf_file:
+        pdf_file.write(make_pdf(make_pages(args.pages, args.words_per_page, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
+import logging
 import os
 
 import streamlit as st
 
 import asyncio
 import time
+import uuid
 
 from chat_management.chatbot import Chatbot
 from chat_management.chat_history import ChatHistory
@@ -13,7 +15,14 @@ from config_manager import ConfigManager
 from model_services.model_comparison import ModelComparison
 from snowflake import SnowflakeGenerator
 from vector_db.redis_manager import RedisManager
-from model_services.model_factory import ModelFactory
+from embeddings.model_registry import ModelRegistry
+from utils.document_parser import DocumentParser
+from chat_management.response_cache import SemanticResponseCache
+from model_services.dispatcher import InferenceDispatcher
+from chat_management.prompt_builder import PromptBuilder
+from chat_management.retrieval_stage import RetrievalStage
+from utils.executors import Executors
+from utils.telemetry import Telemetry
 
 from utils.logger import setup_logging
 logger = setup_logging()
@@ -36,6 +45,7 @@ def initialize_default_session_variables():
     }
     for key, value in default_values.items():
         st.session_state.setdefault(key, value)
+    st.session_state.setdefault('session_id', uuid.uuid4().hex)
 
 # async def manage_responses(history, response_container, prompt_container, model_comparison, model_configs, layout):
 #     """Manage the responses and prompts for the chatbot."""
@@ -81,30 +91,16 @@ async def manage_responses(history, response_container, prompt_container, model_
     if user_input != "":
         st.info(f"{user_input}...")
     if is_ready:
-        logger.info(f"Model configs (in manage_responses): {model_configs}")
+        logger.debug("Comparing %d architectures", len(model_configs))
         try:
-            # Generate a full conversation for the simulation
-            full_conversation = history.get_full_conversation()
-            # logger.info(f"Full conversation: {full_conversation}")
-            # Convert each message in full_conversation to string if it contains AIMessageChunk objects
-            full_conversation_str = ", ".join([str(msg) for msg in full_conversation])
-            logger.info(f"Full conversation: {full_conversation_str}")
-
-            full_conversation_histories = {}
-            for model in model_configs:
-                logger.info(f"Model: {model}")
-                logger.info(f"Model ID: {model.id}")
-                logger.info(f"Model name: {model.model_name}")
-                logger.info(f"Model type: {model.type}")
-                logger.info(f"Model endpoint: {model.endpoint}")
-                # Append full_conversation to full_conversation_histories using model ID as the key
-                full_conversation_histories[model.id] = full_conversation
-            logger.info(f"Full conversation histories: {full_conversation_histories}")
-            # Now display the full conversation for each model
+            # One read of the recent window; each column shows the user's messages and its own answers
+            recent_messages = history.recent_messages()
+            conversation_histories = {model.id: history.messages_for(model.id, recent_messages) for model in model_configs}
             logger.info("Calling display_model_comparison_results...")
-            await ModelComparison.display_model_comparison_results(model_comparison, user_input, full_conversation_histories, model_configs)
+            answers = await ModelComparison.display_model_comparison_results(model_comparison, user_input, conversation_histories, model_configs)
+            recent_messages += history.append_turn(user_input, answers)
 
-            history.generate_messages(response_container)
+            history.generate_messages(response_container, messages=recent_messages)
         except Exception as e:
             st.error(f"Error during model comparisons: {e}")
             logger.error(f"Error during model comparisons: {e}")
@@ -138,28 +134,26 @@ def initialize_ui(configs):
 
 async def main_application_logic(configs, layout, sidebar):
     """Handle the main application logic."""
+    RedisManager.configure_pool(configs['redis'].get('pool'))
     redis_url = RedisManager.build_redis_connection_url(configs['redis'])
 
-    # Assuming that you want to initialize all models or a specific model
-    model_configs = ConfigManager.get_model_configs()
-    models = []
-    for config in model_configs:
-        logger.debug("Config to be passed to ModelFactory:", config)
-        model = ModelFactory.create_inference_model(config)
-        models.append(model)
-
-    # Example of using the first model if specific logic is not required
-    llm = models[0] if models else None
+    # LLM clients are pooled in ModelFactory and picked per column from each architecture's config
 
     sidebar.show_login(configs)
     if st.session_state["authentication_status"]:
-        await process_authenticated_user_flow(configs, layout, sidebar, llm, redis_url)
+        await process_authenticated_user_flow(configs, layout, sidebar, redis_url)
+        pool_stats = RedisManager.pool_stats()
+        Telemetry.record_pool_stats(pool_stats)
+        logger.debug("Redis pool usage: %s", pool_stats)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Inference dispatcher: %s", InferenceDispatcher.stats())
+        logger.debug("Executors: %s", Executors.stats())
 
 
-async def process_authenticated_user_flow(configs, layout, sidebar, llm, redis_url):
+async def process_authenticated_user_flow(configs, layout, sidebar, redis_url):
     """Process the flow for an authenticated user."""
     try:
-        pdf, doc_content = Utilities.handle_file_upload()
+        pdf, page_count = Utilities.handle_file_upload()
         if not pdf:
             st.info("Upload a PDF file to get started", icon="👈")
             return None, None
@@ -175,7 +169,6 @@ async def process_authenticated_user_flow(configs, layout, sidebar, llm, redis_u
             Chatbot.initialize_chatbot_if_absent(
                 session_state=st.session_state,
                 pdf=pdf, 
-                llm=llm, 
                 redis_url=redis_url,
                 history_key="chat_history"
             )
@@ -185,7 +178,7 @@ async def process_authenticated_user_flow(configs, layout, sidebar, llm, redis_u
             # success.empty() # Clear the alert
             st.session_state["ready"] = True
 
-            history = ChatHistory(history_key="chat_history")
+            history = ChatHistory(history_key="chat_history", redis_url=redis_url, session_id=st.session_state.get('session_id'))
             response_container, prompt_container = st.container(), st.container()
             await manage_responses(history, response_container, prompt_container, model_comparison, model_configs, layout)
     except Exception as e:
@@ -196,6 +189,16 @@ async def process_authenticated_user_flow(configs, layout, sidebar, llm, redis_u
 async def main():
     initialize_default_session_variables()
     configs = load_and_validate_config()
+    # Before the warm-up: the embedding model sizes its thread pool from the CPU pool
+    Executors.configure(configs.get('executors'))
+    ModelRegistry.warm_up(configs.get('models'))
+    Telemetry.configure(configs.get('telemetry'))
+    DocumentParser.configure(configs.get('ingestion'))
+    ChatHistory.configure(configs.get('chat_history'))
+    SemanticResponseCache.configure(configs.get('response_cache'))
+    InferenceDispatcher.configure(configs.get('dispatcher'))
+    PromptBuilder.configure(configs.get('prompt'))
+    RetrievalStage.configure(configs.get('retrieval'))
     layout, sidebar = initialize_ui(configs)
     await main_application_logic(configs, layout, sidebar)
     sidebar.about()
@@ -1,21 +1,40 @@
+import json
+
 import streamlit as st
 
-from langchain.memory import ConversationBufferMemory
-from langchain.schema import HumanMessage, AIMessage
 from streamlit_chat import message
 
+from vector_db.redis_manager import RedisManager
+
 class ChatHistory:
     """
     Class to manage the chat history in a Streamlit app.
+
+    Messages are appended to a Redis list per session through the shared pool.
+    Only the most recent `window_messages` are kept, so each turn costs the same
+    however long the conversation gets, and nothing accumulates in
+    `st.session_state`. Messages are only read when displayed.
     """
-    def __init__(self, history_key="chat_history"):
+    DEFAULT_SETTINGS = {
+        'window_messages': 40,  # one user message plus one answer per architecture per turn
+        'ttl_seconds': 86400,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+
+    def __init__(self, history_key="chat_history", redis_url=None, session_id=None):
         self.history_key = history_key
-        if history_key not in st.session_state:
-            st.session_state[history_key] = ConversationBufferMemory(memory_key=history_key, return_messages=True)
-        self.history = st.session_state[history_key]
+        self.client = RedisManager.get_client(redis_url) if redis_url else None
+        self.messages_key = f"chat_history:{session_id or 'anonymous'}:{history_key}:messages"
+
+    @classmethod
+    def configure(cls, history_config):
+        """Apply the `chat_history` section of config.yaml."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(history_config or {})}
 
     def reset(self):
-        st.session_state[self.history_key].clear()
+        if self.client is not None:
+            self.client.delete(self.messages_key)
         st.session_state["reset_chat"] = False
 
     def default_greeting(self):
@@ -28,24 +47,48 @@ class ChatHistory:
         message(self.default_greeting(), key='hi', avatar_style="adventurer", is_user=True)
         message(self.default_prompt(topic), key='ai', avatar_style="thumbs")
 
-    def generate_messages(self, container, history_key="chat_history"):
-            chat_history = st.session_state.get(history_key)
-            if chat_history:
+    def append_turn(self, user_input, answers):
+        """
+        Append a user message and each architecture's answer ({model id: text}) in one round trip,
+        dropping the oldest messages beyond the window. Returns the appended messages.
+        """
+        messages = [{'role': "user", 'content': user_input}]
+        messages += [{'role': "assistant", 'model': model_id, 'content': answer}
+                     for model_id, answer in answers.items() if answer]
+        if self.client is None:
+            return messages
+        pipe = self.client.pipeline(transaction=False)
+        pipe.rpush(self.messages_key, *map(json.dumps, messages))
+        pipe.ltrim(self.messages_key, -self.settings['window_messages'], -1)
+        pipe.expire(self.messages_key, self.settings['ttl_seconds'])
+        pipe.execute()
+        return messages
+
+    def recent_messages(self):
+        """The messages in the window, oldest first, as dicts with role, content (and model for answers)."""
+        if self.client is None:
+            return []
+        return [json.loads(entry) for entry in self.client.lrange(self.messages_key, 0, -1)]
+
+    def messages_for(self, model_id, messages=None):
+        """The user's messages and one architecture's answers, from the window."""
+        messages = self.recent_messages() if messages is None else messages
+        return [msg for msg in messages if msg['role'] == "user" or msg.get('model') == model_id]
+
+    def generate_messages(self, container, history_key="chat_history", messages=None):
+            """Display the window; pass `messages` when they were already read (and appended to) this rerun."""
+            messages = self.recent_messages() if messages is None else messages[-self.settings['window_messages']:]
+            if messages:
                 with container:
-                    messages = chat_history.chat_memory.messages
                     for i, msg in enumerate(messages):
-                        if isinstance(msg, HumanMessage):
-                            message(msg.content, is_user=True, key=f"{i}_user_{history_key}", avatar_style="adventurer")
-                        elif isinstance(msg, AIMessage):
-                            message(msg.content, key=f"{i}_{history_key}", avatar_style="thumbs")
-
-    def get_full_conversation(self):
-        """Retrieve the full conversation history as a list of messages."""
-        return [str(message) for message in self.history.chat_memory.messages]
+                        if msg['role'] == "user":
+                            message(msg['content'], is_user=True, key=f"{i}_user_{history_key}", avatar_style="adventurer")
+                        else:
+                            message(f"{msg.get('model')}: {msg['content']}", key=f"{i}_{history_key}", avatar_style="thumbs")
 
-    def get_recent_context(self):
+    def get_recent_context(self, last_messages=5):
         """Retrieve recent context to append to new queries for better LLM responses."""
-        # This is a simplified example:
-        last_messages = [str(msg) for msg in self.history.chat_memory.messages[-5:]]  # Get the last 5 messages
-        context = " ".join(last_messages)
-        return context
\ No newline at end of file
+        if self.client is None:
+            return ""
+        recent = [json.loads(entry)['content'] for entry in self.client.lrange(self.messages_key, -last_messages, -1)]
+        return " ".join(recent)
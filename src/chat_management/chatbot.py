@@ -1,181 +1,276 @@
 import streamlit as st
-from langchain.chains import LLMChain, ConversationalRetrievalChain
-from langchain.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableParallel, RunnablePassthrough
-from langchain.schema import StrOutputParser
-from langchain.retrievers.document_compressors.flashrank_rerank import FlashrankRerank
-from snowflake import SnowflakeGenerator
 from embeddings.doc_embedding import DocEmbedding
+from vector_db.index_registry import IndexRegistry
+from utils.document_parser import DocumentParser
+from model_services.model_factory import ModelFactory
+from model_services.dispatcher import InferenceDispatcher
 from chat_management.chat_history import ChatHistory
+from chat_management.stream_buffer import StreamBuffer
+from chat_management.prompt_builder import PromptBuilder
+from chat_management.retrieval_stage import RetrievalStage
+from chat_management.response_cache import SemanticResponseCache
+from config_manager import ConfigManager
+from utils.telemetry import Telemetry
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import re
+import time
 
-from utils.logger import setup_logging
+from utils.logger import setup_logging, Truncated
 logger = setup_logging()
 
-executor = ThreadPoolExecutor()
+class Answer:
+    """
+    One architecture's answer to a query and how long each step took, in seconds.
+    `cached` is the CachedResponse it was served from, if any; the timings are then unset.
+    """
+    def __init__(self):
+        self.text = ""
+        self.cached = None
+        self.assembled = None
+        self.retrieval_wait = None
+        self.ttft = None
+        self.generation = None
+
 
 class Chatbot:
-    def __init__(self, retriever, llm, history_key="chat_history"):
+    def __init__(self, retriever, history_key="chat_history", index_name=None, index_registry=None, session_id=None, redis_url=None):
         self.retriever = retriever
-        self.llm = llm
-        self.history = ChatHistory(history_key)
+        self.history = ChatHistory(history_key, redis_url, session_id)
+        self.index_name = index_name
+        self.index_registry = index_registry
+        self.session_id = session_id
 
     @classmethod
-    def initialize_chatbot_if_absent(cls, session_state, pdf, llm, redis_url, history_key="chat_history"):
+    def initialize_chatbot_if_absent(cls, session_state, pdf, redis_url, history_key="chat_history"):
         """Initialize the chatbot if it's not already present in the session state."""
         if 'chatbot' not in session_state:
-            index_generator = SnowflakeGenerator(42)
-            index_name = str(next(index_generator))
-            logger.info("Index Name: " + index_name)
-            chatbot = cls.setup_chatbot(pdf, llm, redis_url, index_name, "redis_schema.yaml", history_key)
+            chatbot = cls.setup_chatbot(pdf, redis_url, history_key, session_state.get('session_id'))
             session_state['chatbot'] = chatbot
 
     @staticmethod
-    def setup_chatbot(uploaded_file, llm, redis_url, index_name, schema, chat_history):
-        """Sets up the chatbot with the uploaded file, model, and chat history."""
-        embeds = DocEmbedding()
+    def setup_chatbot(uploaded_file, redis_url, chat_history, session_id=None):
+        """Sets up the chatbot with the uploaded file and chat history."""
         with st.spinner("Initializing the document retriever..."):
             if uploaded_file:
-                uploaded_file.seek(0)
-                file = uploaded_file.read()
-                embeds.create_doc_embedding(file, redis_url, index_name)
-                retriever = embeds.get_doc_retriever(redis_url, index_name, schema)
-                if retriever:
-                    return Chatbot(retriever, llm, chat_history)
-                else:
+                # Normally memoized when the upload was displayed; parsed in the CPU pool if it was evicted since
+                parsed_document = DocumentParser.load(uploaded_file)
+                progress = None
+
+                def show_progress(done, total):
+                    nonlocal progress
+                    if progress is None:
+                        progress = st.progress(0.0, text="Embedding document...")
+                    progress.progress(done / total, text=f"Embedded {done} of {total} pages")
+
+                chatbot = Chatbot.from_document(parsed_document, redis_url, chat_history, session_id, show_progress)
+                if progress is not None:
+                    progress.empty()
+                if chatbot is None:
                     st.error("Failed to initialize the document retriever.")
-                    return None
+                return chatbot
             else:
                 st.error("Please upload a file to get started.")
                 return None
 
-    async def conversational_chat(self, query, configs, config_index):
-        logger.info("Starting the conversational chat...")
-        if not self.retriever:
-            st.error("Document retriever is not initialized.")
-            return "No retriever available."
-        response = await self.async_invoke_llm(query, configs, config_index)
-        return response
-    
-    async def old_conversational_chat(self, query, config, config_index):
+    @classmethod
+    def from_document(cls, parsed_document, redis_url, chat_history, session_id=None, progress_callback=None):
+        """
+        Index a parsed document, or attach to the index another session already built
+        for the same content, and return a chatbot over it. Renders nothing, so the
+        load generator in benchmarks/ runs the same path as a browser session.
+        """
+        configs = ConfigManager.load_config_details()
+        embeds = DocEmbedding(cache_config=configs.get('embedding_cache'),
+                              ingestion_config=configs.get('ingestion'),
+                              index_config=configs.get('vector_index'))
+        index_name = embeds.index_name_for(parsed_document)
+        logger.info("Index Name: " + index_name)
+        index_config = configs.get('document_index') or {}
+        index_registry = IndexRegistry(redis_url, **index_config)
+        # Lease first, so garbage collection cannot drop the index while we attach to it
+        index_registry.acquire(index_name, session_id)
+        with index_registry.creation_lock(index_name) as lock:
+            if index_registry.is_ready(index_name):
+                logger.info("Document already indexed, attaching to %s", index_name)
+            else:
+                # Left over from a build that failed or whose process died
+                index_registry.discard(index_name)
+
+                def build_progress(done, total):
+                    lock.reacquire()  # still building: restart the lock's timeout
+                    if progress_callback:
+                        progress_callback(done, total)
 
+                try:
+                    embeds.create_doc_embedding(parsed_document, redis_url, index_name, progress_callback=build_progress)
+                except Exception:
+                    index_registry.discard(index_name)
+                    index_registry.release(index_name, session_id)
+                    raise
+                index_registry.mark_ready(index_name)
+                index_registry.collect_garbage()
+        retriever = embeds.get_doc_retriever(redis_url, index_name)
+        if not retriever:
+            index_registry.release(index_name, session_id)
+            return None
+        return cls(retriever, chat_history, index_name, index_registry, session_id, redis_url)
+
+    def retrieval_stage(self, query, configs):
+        """Create the retrieval stage shared by all architectures answering this query."""
+        if self.index_registry is not None:
+            self.index_registry.acquire(self.index_name, self.session_id)
+        return RetrievalStage.for_comparison(self.retriever, query, configs)
+
+    async def conversational_chat(self, query, configs, config_index, container=None, retrieval=None):
+        logger.info("Starting the conversational chat...")
         if not self.retriever:
             st.error("Document retriever is not initialized.")
             return "No retriever available."
-        response = await self.async_invoke_llm(query)
+        response = await self.async_invoke_llm(query, configs, config_index, container, retrieval)
         return response
 
-    async def async_invoke_llm(self, query, config, config_index):
-        """Invoke the LLM asynchronously."""
+    async def async_invoke_llm(self, query, config, config_index, container=None, retrieval=None):
+        """Invoke the LLM asynchronously, rendering into the given container (or the current one)."""
         logger.info("Invoking the LLM asynchronously...")
         model_config = config[config_index]
+        # Columns run concurrently, so never await inside a `with` block: the
+        # other columns would render into whatever container is active here.
+        container = container if container is not None else st.container()
 
-        tab1, tab2, tab3 = st.tabs(["Chat", "Debug", "Details"])
+        tab1, tab2, tab3 = container.tabs(["Chat", "Debug", "Details"])
 
         with tab3:
-            st.write("Model Id") # TODO
+            st.write("Model Id:", model_config.id)
             st.write("Model Configuration")
             st.write("Endpoint:", model_config.endpoint)
             st.write("Description:", model_config.description)
             st.write("Performing RAG:", model_config.uses_rag)
             st.write("Model Name:", model_config.model_name)
 
-        with tab2:
-            # Check if the LLM is initialized
-            if self.llm is None:
-                st.error("LLM is not initialized.")
-                logger.error("LLM is not initialized.")
-                return None
-            else:
-                logger.info("LLM Initialized")
+        # Each column uses the pooled client for its own architecture
+        llm = ModelFactory.get_inference_model(model_config)
+        if llm is None:
+            tab2.error("LLM is not initialized.")
+            logger.error("LLM is not initialized.")
+            return None
+        else:
+            logger.info("LLM Initialized")
 
+        with tab2:
             with st.expander(label="User's Query"):#, expanded=False):
                 st.write(query)
 
-            # Retrieve and display documents asynchronously
-            docs = await self.retriever.ainvoke(query)
-            if docs:
-                
+        if retrieval is None:
+            retrieval = self.retrieval_stage(query, [model_config])
+
+        def show_retrieved(retrieved):
+            with tab2:
                 with st.expander(label="Retrieved Documents"):#, expanded=False):
-                    st.write(docs)#, expanded=False)
-
-                # Rerank documents using Flashrank
-                flashrank_rerank = FlashrankRerank(top_n=3)
-                reranked_docs = await flashrank_rerank.acompress_documents(docs, query)
-
-                with st.expander(label="Reranked Documents"):#, expanded=False):
-                    st.write(reranked_docs)#, expanded=False)
-
-                # for doc in docs:
-                #     st.write(doc if isinstance(doc, str) else doc.page_content)  # Handle both strings and objects with page_content
-            
-            # Construct the prompt including the query and documents, only after the documents have been retrieved
-
-            # prompt = f"""You are an assistant who only responds with three words - no matter what. Literally only three-word responses. How would you respond to: {query}"""
-
-            prompt = f"""You are a helpful assistant who responds in short concise, but accurate statements. How would you respond to the following user query: \n\n{query}"""
-                
-            if model_config and model_config.uses_rag:
-                st.write("Using RAG model")
-                # prompt += f"""\n\nAdditionally, I found the following documents that may be relevant to this inquiry: {[doc if isinstance(doc, str) else doc.page_content for doc in docs]}"""
-                
-                if model_config and model_config.uses_reranking:
-                    docs = reranked_docs
-
-                prompt += "\n\n--- BEGIN DOCS ---n\nAdditionally, I found the following documents that may be relevant to this inquiry:"
-                for idx, doc in enumerate(docs, start=1):
-                    doc_content = doc if isinstance(doc, str) else doc.page_content
-                    prompt += f"\n\n{idx}:\n{doc_content}"
-                prompt += "\n\n--- END DOCS ---\n\n"
-
-            prompt += "\n\nPlease provide a response concisely to the original user query above. You can let the user know if you are not certain of the answer."
-            logger.info(f"Full prompt: {prompt}")
-            with st.expander(label="Prompt including Query and Documents", expanded=False):
-                st.write(prompt)
-
-        with tab1:
-
-            # Stream results and display the output
-            # st.markdown(f"### Result Stream")
-            output_container = st.empty()
-            response_buffer = ""  # Buffer to accumulate responses
-            logger.info("Setting up the chain for fetching and processing documents...")
-            # Prepare the prompt for the Runnable interface
-            runnable_prompt = RunnablePassthrough(lambda _: query) if isinstance(query, str) else RunnablePassthrough(lambda _: str(query))
-            
-            # Define the chain for fetching and processing documents
-            rag_chain_from_docs = (
-                RunnablePassthrough.assign(context=lambda x: "\n\n".join(doc.page_content for doc in x['context']))
-                | runnable_prompt
-                | self.llm
-                | StrOutputParser()
-            )
-
-            # Setup a parallel runnable to handle the retrieval (context) and the LLM processing (question)
-            logger.info("Starting the parallel runnable...")
-            rag_chain_with_source = RunnableParallel(
-                {"context": self.retriever, "question": runnable_prompt}
-            ).assign(answer=rag_chain_from_docs)
-
-            # # # Stream responses from LLM and update the output container continuously
-            # # Activate the spinner before starting the streaming process
-            # with st.spinner(text=''): #text="Loading... Please wait"):
-            #     # Initiate streaming responses from LLM and update the output container continuously
-            #     for chunk in self.llm.stream(prompt):
-            #         if chunk:
-            #             response_buffer += chunk  # Append text to the buffer
-            #             output_container.markdown(response_buffer)  # Display updated response in the output container
-
-            response_buffer = ""
-            output_container = st.empty()
-            logger.info("Starting the streaming process...")
-            with st.spinner(text='Loading... Please wait'):
-                logger.info("Streaming responses from LLM...")
-                logger.info(f"Prompt: {prompt}")
-                logger.warn("Before streaming...")
-                for chunk in self.llm.stream(prompt):
-                    if chunk:
-                        response_buffer += chunk.content  # Ensure chunk.content is a string
-                        output_container.markdown(response_buffer)
+                    st.write(retrieved.docs)#, expanded=False)
+                if retrieved.reranked_docs:
+                    with st.expander(label="Reranked Documents"):#, expanded=False):
+                        st.write(retrieved.reranked_docs)#, expanded=False)
+
+        # prompt = f"""You are an assistant who only responds with three words - no matter what. Literally only three-word responses. How would you respond to: {query}"""
+
+        def show_prompt(assembled, docs):
+            if model_config.uses_rag:
+                tab2.write("Using RAG model")
+            if assembled.dropped:
+                tab2.write(f"Packed {len(assembled.docs)} of {len(docs)} documents into {assembled.doc_tokens} of {model_config.context_token_budget} tokens")
+            with tab2:
+                with st.expander(label="Prompt including Query and Documents", expanded=False):
+                    st.write(assembled.text)
+
+        # Stream results and display the output
+        output_container = tab1.empty()
+        output_container.markdown("_Loading... Please wait_")
+        response_buffer = self.streaming_buffer(output_container)
+        answer = await self.answer(query, model_config, retrieval, llm, on_chunk=response_buffer.append,
+                                   on_retrieved=show_retrieved, on_prompt=show_prompt)
+        if answer.cached is not None:
+            cached = answer.cached
+            tab2.info(f"Answer served from the response cache (similarity {cached.similarity:.3f} to \"{cached.query}\")")
+            return await self.replay_response(answer.text, output_container)
+        response_buffer.flush()
+        Telemetry.record_stage("render", model_config.id, response_buffer.render_seconds)
+        logger.info("Streamed %d chunks in %d renders", response_buffer.chunk_count, response_buffer.flush_count)
+        return answer.text
+
+    async def answer(self, query, model_config, retrieval, llm, on_chunk=None, on_retrieved=None, on_prompt=None):
+        """
+        Answer a query with one architecture, without rendering: the response cache, the wait for the
+        shared retrieval stage, prompt assembly and the streamed completion. The callbacks let the caller
+        show each step as it happens; they must not await, since the other columns run concurrently.
+        """
+        result = Answer()
+        # Near-identical questions asked before (by any session) are answered from the cache
+        query_vector = None
+        if SemanticResponseCache.enabled():
+            # A repeated question is answered without embedding it
+            cached = SemanticResponseCache.lookup_exact(model_config.id, self.index_name, query)
+            if cached is None:
+                query_vector = await retrieval.query_vector()
+                cached = SemanticResponseCache.lookup(model_config.id, self.index_name, query, query_vector)
+            if cached is not None:
+                result.cached = cached
+                result.text = cached.answer
+                return result
+
+        # Only RAG architectures wait on the (shared) retrieval stage
+        docs = []
+        if model_config.uses_rag:
+            started = time.perf_counter()
+            with Telemetry.span("retrieval_wait", model_config.id):
+                retrieved = await retrieval.result()
+            result.retrieval_wait = time.perf_counter() - started
+            docs = retrieved.docs_for(model_config)
+            if on_retrieved is not None:
+                on_retrieved(retrieved)
+
+        # Construct the prompt including the query and documents, only after the documents have been retrieved
+        with Telemetry.span("prompt", model_config.id):
+            assembled = PromptBuilder.build(query, docs, model_config)
+        result.assembled = assembled
+        logger.debug("Full prompt for %s: %s", model_config.id, Truncated(assembled.text))
+        if on_prompt is not None:
+            on_prompt(assembled, docs)
+
+        logger.info("Streaming responses from LLM...")
+        # The dispatcher queues the completion per endpoint on the background loop that owns the
+        # pooled HTTP connections, and shares it with identical in-flight prompts from other sessions.
+        parts = []
+        started = time.perf_counter()
+        with Telemetry.span("generate", model_config.id, doc_tokens=assembled.doc_tokens):
+            async for chunk in InferenceDispatcher.stream(model_config, llm, assembled.text):
+                if result.ttft is None:
+                    result.ttft = time.perf_counter() - started
+                text = StreamBuffer.chunk_text(chunk)
+                if text:
+                    parts.append(text)
+                if on_chunk is not None:
+                    on_chunk(chunk)
+        result.generation = time.perf_counter() - started
+        Telemetry.record_generation(model_config.id, result.ttft, len(parts), result.generation)
+        result.text = "".join(parts)
+        if query_vector is not None:
+            SemanticResponseCache.store(model_config.id, self.index_name, query, query_vector, result.text)
+        return result
+
+    @staticmethod
+    def streaming_buffer(output_container):
+        streaming_config = ConfigManager.load_config_details().get('streaming') or {}
+        return StreamBuffer(
+            output_container,
+            flush_tokens=streaming_config.get('flush_tokens', 8),
+            flush_interval_ms=streaming_config.get('flush_interval_ms', 50)
+        )
 
+    async def replay_response(self, answer, output_container):
+        """Render a stored answer through the same streaming path as a live one."""
+        response_buffer = self.streaming_buffer(output_container)
+        for chunk in re.findall(r"\S+\s*", answer):
+            response_buffer.append(chunk)
+            await asyncio.sleep(0)  # let the other columns render too
+        response_buffer.flush()
+        return response_buffer.text
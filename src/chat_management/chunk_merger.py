@@ -0,0 +1,61 @@
+from langchain_core.documents import Document
+
+
+class ChunkMerger:
+    """
+    Merges retrieved chunks that overlap or touch on the same page into one span.
+
+    Chunks carry the `start_index` of their text within the page, stored at
+    ingestion. A span keeps the rank of its best chunk and the smallest vector
+    distance among its chunks. Chunks without offsets are passed through.
+    """
+
+    @staticmethod
+    def _end(doc):
+        return doc.metadata['start_index'] + len(doc.page_content)
+
+    @staticmethod
+    def merge(docs, max_span_chars=2000):
+        """Return `docs` (best first) with contiguous or overlapping chunks of a page merged."""
+        groups = {}
+        passthrough = []
+        for rank, doc in enumerate(docs):
+            if doc.metadata.get('start_index') is None:
+                passthrough.append((rank, doc))
+            else:
+                groups.setdefault((doc.metadata.get('source'), doc.metadata.get('page')), []).append((rank, doc))
+
+        spans = []
+        for group in groups.values():
+            group.sort(key=lambda item: item[1].metadata['start_index'])
+            current_rank, current = group[0]
+            members = [current]
+            for rank, doc in group[1:]:
+                start = doc.metadata['start_index']
+                end = ChunkMerger._end(current)
+                # the splitter strips the whitespace between chunks, so allow a one-character gap
+                if start <= end + 1 and max(end, ChunkMerger._end(doc)) - current.metadata['start_index'] <= max_span_chars:
+                    if ChunkMerger._end(doc) > end:
+                        separator = " " if start > end else ""
+                        text = current.page_content + separator + doc.page_content[max(end - start, 0):]
+                        current = Document(page_content=text, metadata=dict(current.metadata))
+                    members.append(doc)
+                    current_rank = min(current_rank, rank)
+                else:
+                    spans.append((current_rank, ChunkMerger._finish(current, members)))
+                    current_rank, current, members = rank, doc, [doc]
+            spans.append((current_rank, ChunkMerger._finish(current, members)))
+
+        return [doc for _, doc in sorted(spans + passthrough, key=lambda item: item[0])]
+
+    @staticmethod
+    def _finish(span, members):
+        if len(members) == 1:
+            return members[0]
+        metadata = dict(span.metadata)
+        metadata['end_index'] = ChunkMerger._end(span)
+        metadata['merged_ids'] = [member.metadata.get('id') for member in members]
+        distances = [member.metadata['vector_distance'] for member in members if member.metadata.get('vector_distance') is not None]
+        if distances:
+            metadata['vector_distance'] = min(distances)
+        return Document(page_content=span.page_content, metadata=metadata)
@@ -0,0 +1,124 @@
+import threading
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+PROMPT_HEADER = "You are a helpful assistant who responds in short concise, but accurate statements. How would you respond to the following user query: \n\n{query}"
+DOCS_HEADER = "\n\n--- BEGIN DOCS ---\nAdditionally, I found the following documents that may be relevant to this inquiry:"
+DOCS_FOOTER = "\n\n--- END DOCS ---\n\n"
+PROMPT_FOOTER = "\n\nPlease provide a response concisely to the original user query above. You can let the user know if you are not certain of the answer."
+
+
+class AssembledPrompt:
+    """
+    The final prompt text and the documents that made it into the budget.
+    """
+    def __init__(self, text, docs, doc_tokens, dropped):
+        self.text = text
+        self.docs = docs
+        self.doc_tokens = doc_tokens
+        self.dropped = dropped
+
+
+class PromptBuilder:
+    """
+    Assembles the prompt sent to the model.
+
+    Retrieved documents are taken in rank order, text already covered by a
+    higher-ranked chunk (the splitter overlaps neighbouring chunks by half) is
+    trimmed, and chunks are packed until the architecture's
+    `context_token_budget` is spent. The prompt is joined once at the end.
+    """
+    DEFAULT_SETTINGS = {
+        'encoding': 'cl100k_base',  # tiktoken encoding used to count tokens
+        'min_overlap_chars': 64,  # shortest shared run of text treated as chunk overlap
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _encoder = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, prompt_config):
+        """Apply the `prompt` section of config.yaml."""
+        settings = {**cls.DEFAULT_SETTINGS, **(prompt_config or {})}
+        with cls._lock:
+            if settings['encoding'] != cls.settings['encoding']:
+                cls._encoder = None
+            cls.settings = settings
+
+    @classmethod
+    def get_encoder(cls):
+        """Return the tiktoken encoding, or False when it is unavailable (counts are then estimated)."""
+        with cls._lock:
+            if cls._encoder is None:
+                try:
+                    import tiktoken
+                    cls._encoder = tiktoken.get_encoding(cls.settings['encoding'])
+                except Exception as e:
+                    logger.warning("Token counts will be estimated, tiktoken encoding unavailable: %s", e)
+                    cls._encoder = False
+            return cls._encoder
+
+    @classmethod
+    def count_tokens(cls, text):
+        encoder = cls.get_encoder()
+        if encoder:
+            return len(encoder.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    @classmethod
+    def trim_overlap(cls, text, selected):
+        """Return the part of `text` not already present in the selected chunks, or None if nothing is new."""
+        min_overlap = cls.settings['min_overlap_chars']
+        for other in selected:
+            if text in other:
+                return None
+            if len(text) < min_overlap or len(other) < min_overlap:
+                continue
+            # `text` starts inside `other`: drop the shared prefix
+            start = other.find(text[:min_overlap])
+            if start != -1 and text.startswith(other[start:]):
+                text = text[len(other) - start:]
+                continue
+            # `text` ends inside `other`: drop the shared suffix
+            end = text.find(other[:min_overlap])
+            if end != -1 and other.startswith(text[end:]):
+                text = text[:end]
+        text = text.strip()
+        return text or None
+
+    @classmethod
+    def build(cls, query, docs, model_config):
+        """Assemble the prompt for `query`, packing `docs` (best first) into the model's context budget."""
+        parts = [PROMPT_HEADER.format(query=query)]
+        packed = []
+        doc_tokens = 0
+        dropped = 0
+        if model_config.uses_rag:
+            budget = model_config.context_token_budget
+            selected = []
+            for doc in docs:
+                text = doc if isinstance(doc, str) else doc.page_content
+                text = cls.trim_overlap(text, selected)
+                if text is None:
+                    dropped += 1
+                    continue
+                tokens = cls.count_tokens(text)
+                if doc_tokens + tokens > budget:
+                    # a lower-ranked, shorter chunk may still fit
+                    dropped += 1
+                    continue
+                selected.append(text)
+                packed.append(doc)
+                doc_tokens += tokens
+
+            parts.append(DOCS_HEADER)
+            for idx, text in enumerate(selected, start=1):
+                parts.append(f"\n\n{idx}:\n{text}")
+            parts.append(DOCS_FOOTER)
+        parts.append(PROMPT_FOOTER)
+        if dropped:
+            logger.info("Packed %d of %d documents into %d/%d tokens for %s",
+                        len(packed), len(docs), doc_tokens, model_config.context_token_budget, model_config.id)
+        return AssembledPrompt("".join(parts), packed, doc_tokens, dropped)
@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class CachedResponse:
+    """
+    A stored answer and how closely its original query matched the new one.
+    """
+    def __init__(self, query, answer, similarity):
+        self.query = query
+        self.answer = answer
+        self.similarity = similarity
+
+
+class SemanticResponseCache:
+    """
+    Process-wide cache of answers, keyed by (architecture id, document index,
+    query embedding) and shared by every session.
+
+    `lookup_exact` matches the normalized query text and needs no embedding, so
+    it runs before the query is embedded; `lookup` then uses the most similar
+    stored query within the same architecture and document if its cosine
+    similarity reaches `similarity_threshold`. Each (architecture, document)
+    keeps at most `max_entries_per_scope` entries and its embeddings stacked in
+    one matrix, so a lookup is a dict get or one matrix product. Expired entries
+    are never returned and are swept by `store`, which also evicts the least
+    recently used entries beyond `max_entries` overall.
+    """
+    DEFAULT_SETTINGS = {
+        'enabled': True,
+        'similarity_threshold': 0.95,
+        'max_entries': 1000,
+        'max_entries_per_scope': 100,
+        'ttl_seconds': 3600,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _scopes = OrderedDict()  # (architecture id, index name) -> OrderedDict of normalized query -> entry dict
+    _matrices = {}  # scope -> (normalized queries, stacked unit vectors, creation times), rebuilt after a store
+    _size = 0
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, cache_config):
+        """Apply the `response_cache` section of config.yaml."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(cache_config or {})}
+
+    @classmethod
+    def enabled(cls):
+        return bool(cls.settings['enabled'])
+
+    @staticmethod
+    def normalize(query):
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @classmethod
+    def _touch(cls, scope, key):
+        cls._scopes.move_to_end(scope)
+        cls._scopes[scope].move_to_end(key)
+
+    @classmethod
+    def _remove(cls, scope, key):
+        entries = cls._scopes[scope]
+        del entries[key]
+        cls._size -= 1
+        cls._matrices.pop(scope, None)
+        if not entries:
+            del cls._scopes[scope]
+
+    @classmethod
+    def _matrix(cls, scope, entries):
+        matrix = cls._matrices.get(scope)
+        if matrix is None:
+            keys = list(entries)
+            matrix = (keys, np.stack([entries[key]['vector'] for key in keys]),
+                      np.array([entries[key]['created'] for key in keys]))
+            cls._matrices[scope] = matrix
+        return matrix
+
+    @classmethod
+    def lookup_exact(cls, architecture_id, index_name, query):
+        """Return a CachedResponse for this exact (normalized) question, or None. Needs no query embedding."""
+        scope = (architecture_id, index_name)
+        key = cls.normalize(query)
+        with cls._lock:
+            entry = cls._scopes.get(scope, {}).get(key)
+            if entry is None or time.time() - entry['created'] > cls.settings['ttl_seconds']:
+                return None
+            cls._touch(scope, key)
+        logger.info("Response cache hit for %s (exact)", architecture_id)
+        return CachedResponse(entry['query'], entry['answer'], 1.0)
+
+    @classmethod
+    def lookup(cls, architecture_id, index_name, query, query_vector):
+        """Return a CachedResponse for a similar question to this architecture and document, or None."""
+        scope = (architecture_id, index_name)
+        with cls._lock:
+            entries = cls._scopes.get(scope)
+            if not entries:
+                return None
+            keys, vectors, created = cls._matrix(scope, entries)
+            similarities = vectors @ cls._unit(query_vector)
+            similarities[time.time() - created > cls.settings['ttl_seconds']] = -1.0
+            best = int(np.argmax(similarities))
+            if similarities[best] < cls.settings['similarity_threshold']:
+                return None
+            entry = entries[keys[best]]
+            cls._touch(scope, keys[best])
+        logger.info("Response cache hit for %s (similarity %.3f)", architecture_id, similarities[best])
+        return CachedResponse(entry['query'], entry['answer'], float(similarities[best]))
+
+    @classmethod
+    def store(cls, architecture_id, index_name, query, query_vector, answer):
+        if not answer:
+            return
+        scope = (architecture_id, index_name)
+        key = cls.normalize(query)
+        now = time.time()
+        with cls._lock:
+            entries = cls._scopes.setdefault(scope, OrderedDict())
+            if key not in entries:
+                cls._size += 1
+            entries[key] = {
+                'query': query,
+                'answer': answer,
+                'vector': cls._unit(query_vector),
+                'created': now,
+            }
+            cls._matrices.pop(scope, None)
+            cls._touch(scope, key)
+            for expired in [k for k, entry in entries.items() if now - entry['created'] > cls.settings['ttl_seconds']]:
+                cls._remove(scope, expired)
+            while len(entries) > cls.settings['max_entries_per_scope']:
+                cls._remove(scope, next(iter(entries)))
+            # Beyond the overall bound, evict from the least recently used scope first
+            while cls._size > cls.settings['max_entries']:
+                oldest_scope, oldest_entries = next(iter(cls._scopes.items()))
+                cls._remove(oldest_scope, next(iter(oldest_entries)))
@@ -0,0 +1,228 @@
+import asyncio
+
+from chat_management.chunk_merger import ChunkMerger
+from embeddings.model_registry import ModelRegistry
+from utils.executors import Executors
+from utils.telemetry import Telemetry
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class RetrievalResult:
+    """
+    Documents retrieved for one query, plus their reranked subset when reranking was requested.
+    Each document carries its own `vector_distance` through fusion and merging (none for
+    full-text-only hits), which sizes each column's share.
+    """
+    def __init__(self, docs, reranked_docs=None):
+        self.docs = docs or []
+        self.reranked_docs = reranked_docs or []
+
+    def docs_for(self, model_config):
+        """Return the documents a given architecture should see, within its threshold and adaptive k."""
+        if model_config.uses_reranking:
+            return self.reranked_docs
+        return RetrievalStage.select(self.docs, model_config.retrieval_k, model_config.distance_threshold)
+
+
+class RetrievalStage:
+    """
+    Runs the query embedding, retrieval (Redis KNN) and reranking once per query
+    and shares the results across every architecture in a comparison.
+
+    In `hybrid` mode a BM25 full-text search over the same chunks runs next to
+    the KNN search and both rankings are combined with reciprocal rank fusion,
+    so exact identifiers are found without a large k. When both searches agree
+    on the best chunk, the reranker is skipped.
+
+    Each architecture sets its own `retrieval_k` and `distance_threshold`. The
+    stage fetches the largest `retrieval_k`, and every column then keeps the
+    hits within its threshold, cut short at a large jump in distance or widened
+    (up to `max_k`) when the distances are flat. Only in that last case does
+    the KNN search fetch again, up to `max_k`.
+
+    Overlapping or contiguous hits on the same page are merged into single
+    spans before reranking, so neither the reranker nor the prompt sees the
+    same passage twice.
+    """
+    DEFAULT_SETTINGS = {
+        'mode': "hybrid",
+        'text_k': 10,
+        'rrf_k': 60,
+        'skip_rerank_when_confident': True,
+        'max_k': 20,
+        'gap_threshold': 0.1,
+        'flat_spread': 0.05,
+        'merge_chunks': True,
+        'max_span_chars': 2000,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+
+    def __init__(self, retriever, query, rerank=False, top_n=None, model_configs=None):
+        self.retriever = retriever
+        self.query = query
+        self.rerank = rerank
+        self.top_n = top_n
+        self.model_configs = [config for config in model_configs or [] if config.uses_rag]
+        # Fetch for the loosest threshold among the architectures (None means unbounded)
+        thresholds = [config.distance_threshold for config in self.model_configs]
+        self.distance_threshold = None if not thresholds or None in thresholds else max(thresholds)
+        self.fetch_k = max((config.retrieval_k for config in self.model_configs), default=10)
+        self._embedding_task = None
+        self._task = None
+
+    @classmethod
+    def configure(cls, retrieval_config):
+        """Apply the `retrieval` section of config.yaml."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(retrieval_config or {})}
+
+    @classmethod
+    def for_comparison(cls, retriever, query, model_configs):
+        """Build the stage for a set of architectures. Only those with uses_rag wait on retrieval."""
+        rerank = any(config.uses_rag and config.uses_reranking for config in model_configs)
+        return cls(retriever, query, rerank=rerank, model_configs=model_configs)
+
+    def query_vector(self):
+        """Awaitable for the query embedding, shared by the response cache and retrieval."""
+        if self._embedding_task is None:
+            self._embedding_task = asyncio.ensure_future(self.embed_query())
+        return asyncio.shield(self._embedding_task)
+
+    @staticmethod
+    def fuse(rankings, rrf_k=60, limit=None):
+        """Reciprocal rank fusion of several best-first document lists, matched by id."""
+        scores = {}
+        fused = {}
+        for ranking in rankings:
+            for rank, doc in enumerate(ranking, start=1):
+                doc_id = doc.metadata.get('id')
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+                if doc_id in fused:
+                    fused[doc_id].metadata.update({key: value for key, value in doc.metadata.items() if key not in fused[doc_id].metadata})
+                else:
+                    fused[doc_id] = doc
+        ordered = sorted(fused, key=scores.get, reverse=True)[:limit]
+        for doc_id in ordered:
+            fused[doc_id].metadata['fused_score'] = round(scores[doc_id], 5)
+        return [fused[doc_id] for doc_id in ordered]
+
+    @classmethod
+    def is_flat(cls, distances, k):
+        """True when the first `k` best-first distances are within `flat_spread` of each other."""
+        return 0 < k <= len(distances) and distances[k - 1] - distances[0] <= cls.settings['flat_spread']
+
+    @classmethod
+    def adaptive_k(cls, distances, k, distance_threshold=None):
+        """
+        Number of hits worth keeping given the best-first vector distances: at most
+        `k` within the threshold, fewer when the distance jumps by more than
+        `gap_threshold`, more (up to `max_k`) when the first `k` are within `flat_spread`.
+        A widened count still stops at the first gap.
+        """
+        within = [distance for distance in distances if distance_threshold is None or distance <= distance_threshold]
+        count = min(k, len(within))
+        if count == k and cls.is_flat(within, k):
+            count = min(len(within), max(k, cls.settings['max_k']))
+        for i in range(1, count):
+            if within[i] - within[i - 1] > cls.settings['gap_threshold']:
+                return i
+        return count
+
+    @classmethod
+    def select(cls, docs, k, distance_threshold=None):
+        """
+        Keep, in their given (fused) order, the documents within the threshold and
+        on the near side of any distance gap, sized by adaptive_k over their own
+        distances. Full-text-only hits have no distance and are never cut by it.
+        """
+        kept = [doc for doc in docs if distance_threshold is None
+                or doc.metadata.get('vector_distance') is None
+                or doc.metadata['vector_distance'] <= distance_threshold]
+        distances = sorted(doc.metadata['vector_distance'] for doc in kept if doc.metadata.get('vector_distance') is not None)
+        count = cls.adaptive_k(distances, k)
+        selected = []
+        vector_hits = 0
+        for doc in kept:
+            if len(selected) == max(k, count):
+                break
+            distance = doc.metadata.get('vector_distance')
+            if distance is not None:
+                # only the `count` closest vector hits, whatever their fused rank
+                if vector_hits == count or distance > distances[count - 1]:
+                    continue
+                vector_hits += 1
+            selected.append(doc)
+        return selected
+
+    async def embed_query(self):
+        with Telemetry.span("embed_query"):
+            return await Executors.cpu().run(self.retriever.embeddings.embed_query, self.query)
+
+    def widens_past(self, docs):
+        """True when some architecture, finding these hits flat with no gap, would keep more than were fetched."""
+        distances = [doc.metadata['vector_distance'] for doc in docs]
+        return any(self.is_flat(distances, config.retrieval_k)
+                   and self.adaptive_k(distances, config.retrieval_k, config.distance_threshold) == len(distances)
+                   for config in self.model_configs)
+
+    async def vector_search(self):
+        query_vector = await self.query_vector()
+        with Telemetry.span("vector_search", k=self.fetch_k):
+            docs = await self.retriever.aget_documents_by_vector(query_vector, self.fetch_k, self.distance_threshold)
+        max_k = self.settings['max_k']
+        if len(docs) == self.fetch_k < max_k and self.widens_past(docs):
+            with Telemetry.span("vector_search", k=max_k):
+                docs = await self.retriever.aget_documents_by_vector(query_vector, max_k, self.distance_threshold)
+        return docs
+
+    async def text_search(self):
+        with Telemetry.span("text_search", k=self.settings['text_k']):
+            return await self.retriever.aget_documents_by_text(self.query, self.settings['text_k'])
+
+    async def run(self):
+        confident = False
+        if self.settings['mode'] == "hybrid":
+            vector_docs, text_docs = await asyncio.gather(
+                self.vector_search(),
+                self.text_search())
+            docs = self.fuse([vector_docs, text_docs], self.settings['rrf_k'], limit=max(self.fetch_k, len(vector_docs)))
+            confident = bool(vector_docs and text_docs) and vector_docs[0].metadata['id'] == text_docs[0].metadata['id']
+        else:
+            vector_docs = docs = await self.vector_search()
+        if self.settings['merge_chunks']:
+            hits = len(docs)
+            docs = ChunkMerger.merge(docs, self.settings['max_span_chars'])
+            if len(docs) < hits:
+                logger.info("Merged %d retrieved chunks into %d spans", hits, len(docs))
+        # The reranker only scores what the reranking architectures would have kept
+        rerank_configs = [config for config in self.model_configs if config.uses_reranking]
+        if rerank_configs:
+            rerank_input = max((self.select(docs, config.retrieval_k, config.distance_threshold) for config in rerank_configs), key=len)
+        else:
+            rerank_input = docs
+        reranked_docs = []
+        if rerank_input and self.rerank and confident and self.settings['skip_rerank_when_confident']:
+            reranked_docs = rerank_input[:self.top_n or ModelRegistry.settings['rerank_top_n']]
+            logger.info("Vector and full-text search agree on the best chunk, skipping the reranker")
+        elif rerank_input and self.rerank:
+            flashrank_rerank = ModelRegistry.get_reranker(top_n=self.top_n)
+            with Telemetry.span("rerank", documents=len(rerank_input)):
+                reranked_docs = await Executors.cpu().run(flashrank_rerank.compress_documents, rerank_input, self.query)
+        logger.info("Retrieved %d documents, reranked %d to %d", len(docs), len(rerank_input), len(reranked_docs))
+        return RetrievalResult(docs, reranked_docs)
+
+    def result(self):
+        """
+        Awaitable for the shared result. The work starts on first use, and a
+        column that is cancelled does not cancel it for the other columns.
+        """
+        if self._task is None:
+            self._task = asyncio.ensure_future(self.run())
+        return asyncio.shield(self._task)
+
+    def cancel(self):
+        for task in (self._embedding_task, self._task):
+            if task is not None and not task.done():
+                task.cancel()
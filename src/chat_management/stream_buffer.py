@@ -0,0 +1,54 @@
+import time
+
+
+class StreamBuffer:
+    """
+    Accumulates streamed LLM chunks and flushes them to a Streamlit placeholder
+    every `flush_tokens` chunks or `flush_interval_ms` milliseconds, whichever comes first.
+    """
+
+    def __init__(self, output_container, flush_tokens=8, flush_interval_ms=50):
+        self.output_container = output_container
+        self.flush_tokens = max(1, int(flush_tokens))
+        self.flush_interval = max(0, flush_interval_ms) / 1000
+        self.chunk_count = 0
+        self.flush_count = 0
+        self.render_seconds = 0.0
+        self._parts = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def chunk_text(chunk):
+        """Return the text of a chunk: ChatOpenAI yields message chunks, Ollama and HF TGI yield strings."""
+        if isinstance(chunk, str):
+            return chunk
+        return getattr(chunk, "content", "") or ""
+
+    @property
+    def text(self):
+        return "".join(self._parts)
+
+    def append(self, chunk):
+        """Add a chunk, flushing to the placeholder if the cadence is due."""
+        text = self.chunk_text(chunk)
+        if not text:
+            return
+        self._parts.append(text)
+        self._pending += 1
+        self.chunk_count += 1
+        if self._pending >= self.flush_tokens or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Render everything received so far."""
+        if not self._pending:
+            return
+        # Collapse the parts so the next join only touches the new chunks
+        start = time.monotonic()
+        self._parts = [self.text]
+        self.output_container.markdown(self._parts[0])
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.render_seconds += self._last_flush - start
+        self.flush_count += 1
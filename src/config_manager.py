@@ -1,5 +1,6 @@
 import yaml
 import os
+import threading
 import streamlit as st
 from model_services.model_config import ModelConfig
 
@@ -9,35 +10,58 @@ logger = setup_logging()
 class ConfigManager:
     """ Manages application configuration. """
 
+    # config path -> {'mtime', 'configurations', 'model_configs'}; reparsed only when the file changes
+    _cache = {}
+    _lock = threading.Lock()
+
     @staticmethod
-    def load_config_details():
-        """ Load configuration details from a YAML file. """
+    def _cached_entry():
         config_path = os.getenv('CONFIG_PATH', 'config.yaml')
-        with open(config_path, 'r') as config_file:
-            configurations = yaml.safe_load(config_file)
-        return configurations
+        # stat follows the symlinks a mounted ConfigMap swaps on update
+        mtime = os.stat(config_path).st_mtime_ns
+        with ConfigManager._lock:
+            entry = ConfigManager._cache.get(config_path)
+            if entry is None or entry['mtime'] != mtime:
+                with open(config_path, 'r') as config_file:
+                    configurations = yaml.safe_load(config_file)
+                entry = {'mtime': mtime, 'configurations': configurations, 'model_configs': None}
+                ConfigManager._cache[config_path] = entry
+                logger.info("Loaded configuration from %s", config_path)
+            return entry
+
+    @staticmethod
+    def load_config_details():
+        """ Load configuration details from a YAML file. The parsed result is shared, so treat it as read-only. """
+        return ConfigManager._cached_entry()['configurations']
 
     @staticmethod
     def get_model_configs():
-        """ Retrieve model configurations from the YAML file. """
-        configs = ConfigManager.load_config_details()
-        if configs and 'architectures' in configs:
-            model_configs = [ModelConfig(
-                id=arch.get('id'),
-                name=arch['name'],
-                description=arch['description'],
-                endpoint=arch['endpoint'],
-                uses_rag=arch['uses_rag'],
-                uses_reranking=arch.get('uses_reranking', False),
-                model_name=arch.get('model_name', 'default_model_name'),
-                model_source=arch.get('model_source', 'default_model_source'),
-                type=arch.get('type', 'ollama'))  # Ensure the type is being set correctly
-                for arch in configs['architectures']]
-            for config in model_configs:
-                logger.debug("Created ModelConfig:", config)  # This will use the __str__ method
-            return model_configs
-        else:
-            return [] 
+        """ Retrieve model configurations from the YAML file, built once per version of the file. """
+        entry = ConfigManager._cached_entry()
+        if entry['model_configs'] is None:
+            configs = entry['configurations']
+            if configs and 'architectures' in configs:
+                model_configs = tuple(ModelConfig(
+                    id=arch.get('id'),
+                    name=arch['name'],
+                    description=arch['description'],
+                    endpoint=arch['endpoint'],
+                    uses_rag=arch['uses_rag'],
+                    uses_reranking=arch.get('uses_reranking', False),
+                    model_name=arch.get('model_name', 'default_model_name'),
+                    model_source=arch.get('model_source', 'default_model_source'),
+                    type=arch.get('type', 'ollama'),  # Ensure the type is being set correctly
+                    timeout=arch.get('timeout', 120),
+                    context_token_budget=arch.get('context_token_budget', 1536),
+                    retrieval_k=arch.get('retrieval_k', 10),
+                    distance_threshold=arch.get('distance_threshold'))
+                    for arch in configs['architectures'])
+                for config in model_configs:
+                    logger.debug("Created ModelConfig: %s", config)  # This will use the __str__ method
+            else:
+                model_configs = ()
+            entry['model_configs'] = model_configs
+        return list(entry['model_configs'])
 
     @staticmethod
     def validate_configurations(configurations):
@@ -1,10 +1,12 @@
-import os
-import tempfile
+import hashlib
 
-from langchain_community.document_loaders import PyPDFium2Loader
-from langchain.embeddings.huggingface import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.vectorstores.redis import Redis
+
+from embeddings.embedding_cache import CachedEmbeddings
+from embeddings.ingestion_pipeline import IngestionPipeline
+from embeddings.model_registry import ModelRegistry
+from vector_db.redis_vector_store import RedisVectorRetriever, RedisVectorStore
+from utils.telemetry import Telemetry
 
 from utils.logger import setup_logging
 logger = setup_logging()
@@ -15,47 +17,54 @@ class DocEmbedding:
     Class to manage document embeddings.
     """
 
-    def __init__(self):
-        self.embeddings = HuggingFaceEmbeddings()
-        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=750, chunk_overlap=375)
+    CHUNK_SIZE = 750
+    CHUNK_OVERLAP = 375
+    # Bump when the fields stored per chunk change, so existing indexes are rebuilt
+    SCHEMA_VERSION = 2
+
+    def __init__(self, cache_config=None, ingestion_config=None, index_config=None):
+        self.cache_config = cache_config
+        self.ingestion_config = ingestion_config
+        self.index_config = index_config or {}
+        # Includes the backend, since quantized vectors differ from the reference model's
+        self.embedding_model = ModelRegistry.embedding_id()
+        self.embeddings = ModelRegistry.get_embeddings()
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=self.CHUNK_SIZE, chunk_overlap=self.CHUNK_OVERLAP, add_start_index=True)
 
-    def create_doc_embedding(self, file, redis_url, index_name) -> None:
+    def index_name_for(self, parsed_document):
         """
-        Stores document embeddings using Langchain and FAISS
+        Content-addressed index name: the same bytes split and embedded the same
+        way always map to the same index, whichever session uploaded them.
         """
-        # Create a temporary file and write the PDF data to it
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(file)
-            tmp_file_path = tmp_file.name
-
-        # Now you can use the file path with PyPDFium2Loader
-        loader = PyPDFium2Loader(tmp_file_path)
-        documents = loader.load()
+        fingerprint = hashlib.sha256(parsed_document.file_hash.encode())
+        fingerprint.update(f"|{self.CHUNK_SIZE}|{self.CHUNK_OVERLAP}|{self.embedding_model}|v{self.SCHEMA_VERSION}".encode())
+        # Index layout changes (algorithm, datatype, HNSW parameters) need a new index too
+        index_settings = {**RedisVectorStore.DEFAULT_SETTINGS, **self.index_config}
+        fingerprint.update(repr(sorted((key, value) for key, value in index_settings.items() if key != 'batch_size')).encode())
+        return f"doc_{fingerprint.hexdigest()[:32]}"
 
-        all_splits = self.text_splitter.split_documents(documents)
-        logger.info(f"Loaded {len(all_splits)} document chunks.")
-
-        # Store the embeddings vectors using Redis
-        rds = Redis.from_documents(all_splits,
-                                   self.embeddings,
-                                   redis_url=redis_url,
-                                   index_name=index_name)
-        rds.write_schema("redis_schema.yaml")
-        logger.info(f"Stored document to index: {rds.index_name}")
-        os.remove(tmp_file_path)
+    def create_doc_embedding(self, parsed_document, redis_url, index_name, progress_callback=None) -> None:
+        """
+        Stores document embeddings in Redis, streaming the parsed pages through the ingestion pipeline
+        """
+        # Encode only chunks not already in the cache
+        embeddings = CachedEmbeddings.from_config(self.embeddings, self.embedding_model, self.cache_config, redis_url)
+        pipeline = IngestionPipeline(self.text_splitter, embeddings, self.ingestion_config)
+        store = RedisVectorStore(redis_url, index_name, self.index_config)
+        with Telemetry.span("ingest", pages=parsed_document.page_count):
+            chunk_count = pipeline.run(parsed_document, store, progress_callback)
+        if not chunk_count:
+            raise ValueError("No text could be extracted from the document.")
+        logger.info("Stored document to index: %s", store.index_name)
+        if isinstance(embeddings, CachedEmbeddings):
+            logger.info("Embedding cache: %s", embeddings.stats())
 
-    def get_doc_retriever(self, redis_url, index_name, schema):
+    def get_doc_retriever(self, redis_url, index_name):
         """
         Retrieves document embeddings
         """
-        rds = Redis.from_existing_index(
-            self.embeddings,
-            redis_url=redis_url,
-            index_name=index_name,
-            schema=schema,
-        )
-        retriever = rds.as_retriever(search_type="similarity",
-                                     search_kwargs={"k": 10, "similarity": 0.3})
+        store = RedisVectorStore(redis_url, index_name, self.index_config)
+        retriever = RedisVectorRetriever(store=store, embeddings=self.embeddings, k=10)
         return retriever
     
     def use_retriever(self, retriever, query):
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.stores import ByteStore
+from langchain_community.storage import RedisStore
+
+from vector_db.redis_manager import RedisManager
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class BoundedFileStore(ByteStore):
+    """
+    Byte store with one file per key under `root_path`, capped at `max_bytes`.
+    Reads refresh a file's modification time, and once the store grows past the
+    cap the least recently used files are deleted until it is back under 90% of it.
+    """
+    KEY_PATTERN = re.compile(r"[a-zA-Z0-9_.\-]+(/[a-zA-Z0-9_.\-]+)*")
+
+    def __init__(self, root_path, max_bytes):
+        self.root_path = Path(root_path).absolute()
+        self.max_bytes = max_bytes
+        self._size = None  # bytes on disk, counted on the first write
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        if not self.KEY_PATTERN.fullmatch(key) or ".." in key.split("/"):
+            raise ValueError(f"Invalid cache key: {key}")
+        return self.root_path / key
+
+    def _files(self):
+        return [path for path in self.root_path.rglob("*") if path.is_file()]
+
+    def mget(self, keys):
+        values = []
+        for key in keys:
+            path = self._path(key)
+            try:
+                values.append(path.read_bytes())
+                os.utime(path)  # mark as recently used
+            except FileNotFoundError:
+                values.append(None)
+        return values
+
+    def mset(self, key_value_pairs):
+        written = 0
+        for key, value in key_value_pairs:
+            path = self._path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Written aside and renamed, so a concurrent reader never sees a partial vector
+            with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp_file:
+                tmp_file.write(value)
+            os.replace(tmp_file.name, path)
+            written += len(value)
+        with self._lock:
+            self._size = sum(path.stat().st_size for path in self._files()) if self._size is None else self._size + written
+            if self._size > self.max_bytes:
+                self._prune()
+
+    def _prune(self):
+        entries = []
+        for path in self._files():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+        self._size = size
+        logger.info("Pruned %d embedding cache files, %d bytes left in %s", removed, size, self.root_path)
+
+    def mdelete(self, keys):
+        for key in keys:
+            self._path(key).unlink(missing_ok=True)
+
+    def yield_keys(self, prefix=None):
+        for path in self._files():
+            key = path.relative_to(self.root_path).as_posix()
+            if prefix is None or key.startswith(prefix):
+                yield key
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that stores document vectors by chunk hash and only
+    encodes the chunks missing from every cache store, in one batch.
+
+    Stores are checked in order (e.g. local disk, then Redis); a hit in a later
+    store is copied back into the earlier ones. Queries are not cached.
+    """
+
+    def __init__(self, embeddings, stores, namespace):
+        self.embeddings = embeddings
+        self.stores = stores
+        self.namespace = re.sub(r"[^a-zA-Z0-9_.\-]", "_", namespace)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, embeddings, model_name, cache_config, redis_url=None):
+        """Wrap `embeddings` with the stores listed in the `embedding_cache` section of config.yaml."""
+        cache_config = cache_config or {}
+        stores = []
+        for backend in cache_config.get('backends') or []:
+            if backend == "local":
+                stores.append(BoundedFileStore(cache_config.get('local_path', ".cache/embeddings"),
+                                               int(cache_config.get('local_max_mb', 512)) * 1024 * 1024))
+            elif backend == "redis" and redis_url:
+                stores.append(RedisStore(client=RedisManager.get_client(redis_url),
+                                         namespace="embedding_cache",
+                                         ttl=cache_config.get('redis_ttl_seconds')))
+            else:
+                logger.warning("Ignoring embedding cache backend: %s", backend)
+        if not stores:
+            return embeddings
+        return cls(embeddings, stores, model_name)
+
+    def _key(self, text):
+        return f"{self.namespace}/{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    @staticmethod
+    def _encode(vector):
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(value):
+        return np.frombuffer(value, dtype=np.float32).tolist()
+
+    def embed_documents(self, texts):
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = list(range(len(texts)))
+
+        for level, store in enumerate(self.stores):
+            if not missing:
+                break
+            values = store.mget([keys[i] for i in missing])
+            backfill = []
+            still_missing = []
+            for i, value in zip(missing, values):
+                if value is None:
+                    still_missing.append(i)
+                else:
+                    vectors[i] = self._decode(value)
+                    backfill.append((keys[i], value))
+            for earlier_store in self.stores[:level]:
+                if backfill:
+                    earlier_store.mset(backfill)
+            missing = still_missing
+
+        if missing:
+            # Identical chunks inside one document are encoded once as well
+            unique_texts = list(dict.fromkeys(texts[i] for i in missing))
+            encoded = dict(zip(unique_texts, self.embeddings.embed_documents(unique_texts)))
+            new_entries = {}
+            for i in missing:
+                vectors[i] = encoded[texts[i]]
+                new_entries[keys[i]] = self._encode(vectors[i])
+            for store in self.stores:
+                store.mset(list(new_entries.items()))
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return vectors
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': round(self.hit_rate, 3)}
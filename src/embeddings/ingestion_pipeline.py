@@ -0,0 +1,67 @@
+from langchain_core.documents import Document
+
+from utils.executors import Executors
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class IngestionPipeline:
+    """
+    Staged ingestion of a parsed document into a RedisVectorStore:
+    incremental splitting -> batched embedding -> pipelined Redis writes per batch.
+
+    Embedding runs in the shared CPU pool and each batch's Redis write in the
+    I/O pool, overlapping with the next batch's embedding. At most two batches
+    of chunks and vectors are held in memory, whatever the size of the document.
+    Page text comes from DocumentParser, which extracts PDFs in worker processes.
+    """
+    DEFAULT_SETTINGS = {
+        'embed_batch_size': 64,
+    }
+
+    def __init__(self, text_splitter, embeddings, settings=None):
+        self.text_splitter = text_splitter
+        self.embeddings = embeddings
+        self.settings = {**self.DEFAULT_SETTINGS, **(settings or {})}
+
+    def chunks(self, pages, source):
+        """
+        Split page by page, as PyPDFium2Loader + split_documents did, without splitting the whole document at once.
+        The splitter records each chunk's `start_index` within its page.
+        """
+        for page_index, text in enumerate(pages):
+            page = Document(page_content=text, metadata={"source": source, "page": page_index})
+            yield from self.text_splitter.split_documents([page])
+
+    def batches(self, chunks):
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.settings['embed_batch_size']:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, parsed_document, store, progress_callback=None):
+        """Ingest a ParsedDocument into `store`, creating its index from the first batch. Returns the chunk count."""
+        total_pages = parsed_document.page_count
+        chunk_count = 0
+        pending_write = None
+        try:
+            for batch in self.batches(self.chunks(parsed_document.iter_pages(), parsed_document.name)):
+                vectors = Executors.cpu().call(self.embeddings.embed_documents, [chunk.page_content for chunk in batch])
+                if not chunk_count:
+                    store.create_index(dims=len(vectors[0]))
+                if pending_write is not None:
+                    pending_write.result()
+                pending_write = Executors.io().submit(store.add_documents, batch, vectors)
+                chunk_count += len(batch)
+                if progress_callback:
+                    progress_callback(batch[-1].metadata["page"] + 1, total_pages)
+        finally:
+            if pending_write is not None:
+                pending_write.result()
+        logger.info("Ingested %s chunks from %s pages into %s", chunk_count, total_pages, store.index_name)
+        return chunk_count
@@ -0,0 +1,132 @@
+import resource
+import threading
+import time
+
+from langchain.embeddings.huggingface import HuggingFaceEmbeddings
+from langchain.retrievers.document_compressors.flashrank_rerank import FlashrankRerank
+
+from embeddings.onnx_embeddings import OnnxEmbeddings
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+def current_rss_mb():
+    """Return the resident memory of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            resident_pages = int(statm.read().split()[1])
+        return resident_pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, IndexError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each embedding and rerank model once and
+    shares it across Streamlit sessions and threads.
+    """
+    DEFAULT_SETTINGS = {
+        'embedding_model': "sentence-transformers/all-mpnet-base-v2",
+        'embedding_backend': "torch",  # torch (HuggingFaceEmbeddings) or onnx (OnnxEmbeddings)
+        'onnx': {},  # OnnxEmbeddings settings: quantize, batch_size, intra_op_threads, max_length
+        'rerank_model': "ms-marco-MultiBERT-L-12",
+        'rerank_top_n': 3,
+        'preload': False,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _models = {}
+    _stats = {}
+    _lock = threading.Lock()
+    _key_locks = {}
+    _warm_up_thread = None
+
+    @classmethod
+    def configure(cls, models_config):
+        """Apply the `models` section of config.yaml."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(models_config or {})}
+
+    @classmethod
+    def _get_or_load(cls, key, loader):
+        model = cls._models.get(key)
+        if model is not None:
+            return model
+        with cls._lock:
+            key_lock = cls._key_locks.setdefault(key, threading.Lock())
+        # Per-model lock: concurrent sessions wait for the one load instead of each starting their own
+        with key_lock:
+            model = cls._models.get(key)
+            if model is None:
+                rss_before = current_rss_mb()
+                start = time.perf_counter()
+                model = loader()
+                cls._stats[key] = {
+                    'load_seconds': round(time.perf_counter() - start, 3),
+                    'rss_delta_mb': round(current_rss_mb() - rss_before, 1),
+                }
+                cls._models[key] = model
+                logger.info("Loaded %s in %ss (+%s MB RSS)", key, cls._stats[key]['load_seconds'], cls._stats[key]['rss_delta_mb'])
+        return model
+
+    @classmethod
+    def embedding_id(cls, model_name=None, backend=None):
+        """
+        Identifies the vectors a model and backend produce, for index names and cache keys.
+        The torch backend keeps the bare model name, so existing indexes and caches stay valid.
+        """
+        model_name = model_name or cls.settings['embedding_model']
+        backend = backend or cls.settings['embedding_backend']
+        if backend == "onnx":
+            onnx_settings = {**OnnxEmbeddings.DEFAULT_SETTINGS, **(cls.settings['onnx'] or {})}
+            return f"{model_name}:onnx-{'int8' if onnx_settings['quantize'] else 'fp32'}"
+        return model_name
+
+    @classmethod
+    def get_embeddings(cls, model_name=None, backend=None):
+        """Return the shared embeddings model for the configured (or given) backend."""
+        model_name = model_name or cls.settings['embedding_model']
+        backend = backend or cls.settings['embedding_backend']
+        if backend == "onnx":
+            onnx_settings = dict(cls.settings['onnx'] or {})
+            return cls._get_or_load(("embeddings", cls.embedding_id(model_name, backend)), lambda: OnnxEmbeddings(model_name, onnx_settings))
+        if backend != "torch":
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+        return cls._get_or_load(("embeddings", model_name), lambda: HuggingFaceEmbeddings(model_name=model_name))
+
+    @classmethod
+    def get_reranker(cls, model_name=None, top_n=None):
+        """Return the shared Flashrank reranker."""
+        model_name = model_name or cls.settings['rerank_model']
+        top_n = top_n or cls.settings['rerank_top_n']
+        return cls._get_or_load(("rerank", model_name, top_n), lambda: FlashrankRerank(model=model_name, top_n=top_n))
+
+    @classmethod
+    def warm_up(cls, models_config=None):
+        """Load the configured models in a background thread if `preload` is set. Safe to call on every rerun."""
+        if models_config is not None:
+            cls.configure(models_config)
+        if not cls.settings['preload']:
+            return
+        with cls._lock:
+            if cls._warm_up_thread is not None:
+                return
+            cls._warm_up_thread = threading.Thread(target=cls._load_defaults, name="model-warm-up", daemon=True)
+        cls._warm_up_thread.start()
+
+    @classmethod
+    def _load_defaults(cls):
+        try:
+            cls.get_embeddings()
+            cls.get_reranker()
+            logger.info("Model warm-up complete: %s", cls.stats())
+        except Exception as e:
+            logger.error("Model warm-up failed: %s", e)
+
+    @classmethod
+    def stats(cls):
+        """Return load time and memory cost per loaded model, plus the current process RSS."""
+        return {
+            'models': {"/".join(str(part) for part in key): dict(stats) for key, stats in cls._stats.items()},
+            'rss_mb': round(current_rss_mb(), 1),
+        }
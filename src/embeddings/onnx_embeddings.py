@@ -0,0 +1,104 @@
+import os
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.executors import Executors
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings run with ONNX Runtime on the CPU.
+
+    The model's ONNX export and tokenizer are fetched from the Hugging Face Hub
+    (sentence-transformers repositories ship `onnx/model.onnx`). With `quantize`
+    the weights are converted to int8 once with dynamic quantization and the
+    result is kept under `cache_dir`. Texts are batched by length to limit
+    padding, mean-pooled over the attention mask and L2-normalized, as the
+    sentence-transformers pipeline for these models does.
+    """
+    DEFAULT_SETTINGS = {
+        'quantize': True,
+        'batch_size': 32,
+        'intra_op_threads': None,  # None: the cores divided among the CPU pool's workers
+        'max_length': 384,
+        'cache_dir': ".cache/onnx",
+    }
+
+    @staticmethod
+    def default_threads():
+        """Cores per CPU-pool worker, so the workers embedding at once do not oversubscribe the cores."""
+        return max(1, (os.cpu_count() or 1) // max(1, int(Executors.settings['cpu_workers'])))
+
+    def __init__(self, model_name, settings=None):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.settings = {**self.DEFAULT_SETTINGS, **(settings or {})}
+        model_path = self.model_path()
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = int(self.settings['intra_op_threads'] or self.default_threads())
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(self._download("tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=int(self.settings['max_length']))
+        self.tokenizer.enable_padding()
+        # InferenceSession.run is thread-safe, but the tokenizer's padding state is shared
+        self._lock = threading.Lock()
+        logger.info("Loaded ONNX embeddings %s from %s", model_name, model_path)
+
+    def _download(self, filename):
+        from huggingface_hub import hf_hub_download
+        return hf_hub_download(repo_id=self.model_name, filename=filename)
+
+    def model_path(self):
+        """Path of the ONNX model to run, quantizing the export on first use."""
+        model_path = self._download("onnx/model.onnx")
+        if not self.settings['quantize']:
+            return model_path
+        quantized_path = os.path.join(self.settings['cache_dir'], self.model_name.replace("/", "__"), "model_int8.onnx")
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            os.makedirs(os.path.dirname(quantized_path), exist_ok=True)
+            partial_path = f"{quantized_path}.{os.getpid()}.tmp"
+            quantize_dynamic(model_path, partial_path, weight_type=QuantType.QInt8)
+            os.replace(partial_path, quantized_path)
+            logger.info("Quantized %s to int8 at %s", self.model_name, quantized_path)
+        return quantized_path
+
+    def _embed_batch(self, texts):
+        with self._lock:
+            encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {'input_ids': input_ids, 'attention_mask': attention_mask}
+        if 'token_type_ids' in self.input_names:
+            inputs['token_type_ids'] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, inputs)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        batch_size = int(self.settings['batch_size'])
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch])):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_query(self, text):
+        return self._embed_batch([text])[0].tolist()
@@ -0,0 +1,30 @@
+"""
+Page-level PDF text extraction. Kept free of heavy imports because these
+functions run in worker processes.
+"""
+
+
+def count_pages(path):
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def extract_page_range(path, start, stop):
+    """Return the text of pages [start, stop) of the PDF at `path`."""
+    import pypdfium2 as pdfium
+    pdf = pdfium.PdfDocument(path)
+    try:
+        texts = []
+        for index in range(start, stop):
+            page = pdf[index]
+            text_page = page.get_textpage()
+            texts.append(text_page.get_text_range())
+            text_page.close()
+            page.close()
+        return texts
+    finally:
+        pdf.close()
@@ -0,0 +1,116 @@
+"""
+Measures what an embedding backend or model costs in retrieval quality
+against the reference (torch all-mpnet-base-v2), on a real document.
+
+    cd src && python -m embeddings.recall_check manual.pdf --backend onnx
+    cd src && python -m embeddings.recall_check manual.pdf --model sentence-transformers/all-MiniLM-L6-v2 --queries queries.txt
+
+Both backends embed the same chunks (split as DocEmbedding does) and the same
+queries. Reported: recall@k of the candidate's top-k against the reference's
+top-k, the mean cosine between the two vectors of each chunk when the model is
+the same, and the embedding throughput of each.
+"""
+import argparse
+import json
+import random
+import re
+import time
+
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from config_manager import ConfigManager
+from embeddings.doc_embedding import DocEmbedding
+from embeddings.model_registry import ModelRegistry
+from embeddings.pdf_pages import count_pages, extract_page_range
+
+
+def load_chunks(path):
+    if path.lower().endswith(".pdf"):
+        pages = extract_page_range(path, 0, count_pages(path))
+    else:
+        with open(path, encoding="utf-8") as text_file:
+            pages = [text_file.read()]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=DocEmbedding.CHUNK_SIZE, chunk_overlap=DocEmbedding.CHUNK_OVERLAP)
+    return [chunk for page in pages for chunk in splitter.split_text(page)]
+
+
+def sample_queries(chunks, count, seed=0):
+    """Use the first sentence of randomly chosen chunks as queries when none are given."""
+    rng = random.Random(seed)
+    queries = []
+    for chunk in rng.sample(chunks, min(count, len(chunks))):
+        sentence = re.split(r"(?<=[.!?])\s", chunk.strip(), maxsplit=1)[0]
+        queries.append(sentence[:200])
+    return queries
+
+
+def embed(embeddings, chunks, queries):
+    start = time.perf_counter()
+    chunk_vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    seconds = time.perf_counter() - start
+    query_vectors = np.asarray([embeddings.embed_query(query) for query in queries], dtype=np.float32)
+    return chunk_vectors, query_vectors, seconds
+
+
+def normalized(vectors):
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def top_k(chunk_vectors, query_vectors, k):
+    scores = normalized(query_vectors) @ normalized(chunk_vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_check(path, backend, model_name, queries=None, k=10, sample_size=50):
+    ModelRegistry.configure(ConfigManager.load_config_details().get('models'))
+    reference_model = ModelRegistry.DEFAULT_SETTINGS['embedding_model']
+    model_name = model_name or reference_model
+
+    chunks = load_chunks(path)
+    queries = queries or sample_queries(chunks, sample_size)
+    k = min(k, len(chunks))
+
+    reference = embed(ModelRegistry.get_embeddings(reference_model, "torch"), chunks, queries)
+    candidate = embed(ModelRegistry.get_embeddings(model_name, backend), chunks, queries)
+
+    reference_top = top_k(reference[0], reference[1], k)
+    candidate_top = top_k(candidate[0], candidate[1], k)
+    recall = np.mean([len(set(ref) & set(cand)) / k for ref, cand in zip(reference_top, candidate_top)])
+
+    report = {
+        'document': path,
+        'chunks': len(chunks),
+        'queries': len(queries),
+        'k': k,
+        'reference': {'embedding': ModelRegistry.embedding_id(reference_model, "torch"),
+                      'chunks_per_second': round(len(chunks) / reference[2], 1)},
+        'candidate': {'embedding': ModelRegistry.embedding_id(model_name, backend),
+                      'chunks_per_second': round(len(chunks) / candidate[2], 1)},
+        f'recall_at_{k}': round(float(recall), 4),
+        'top1_agreement': round(float(np.mean(reference_top[:, 0] == candidate_top[:, 0])), 4),
+    }
+    if model_name == reference_model:
+        cosines = np.sum(normalized(reference[0]) * normalized(candidate[0]), axis=1)
+        report['mean_vector_cosine'] = round(float(cosines.mean()), 5)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("document", help="PDF or text file to split and embed")
+    parser.add_argument("--backend", default="onnx", choices=("torch", "onnx"))
+    parser.add_argument("--model", help="candidate embedding model (default: the reference model)")
+    parser.add_argument("--queries", help="file with one query per line (default: sampled from the document)")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    queries = None
+    if args.queries:
+        with open(args.queries, encoding="utf-8") as queries_file:
+            queries = [line.strip() for line in queries_file if line.strip()]
+    print(json.dumps(recall_check(args.document, args.backend, args.model, queries, args.k), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import asyncio
+import time
+
+from model_services.model_factory import ModelFactory
+from utils.background_loop import BackgroundLoop
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+_DONE = object()
+
+
+class _Flight:
+    """
+    One upstream completion and the callers waiting on it. Chunks are kept so a
+    caller joining mid-stream replays what was already generated.
+    """
+    def __init__(self, key, endpoint):
+        self.key = key
+        self.endpoint = endpoint
+        self.chunks = []
+        self.subscribers = set()
+        self.finished = False
+        self.error = None
+        self.task = None
+
+
+class _Subscription:
+    """A caller's `deliver` callback and the flight it joined, once `_join` has run."""
+    def __init__(self, deliver):
+        self.deliver = deliver
+        self.flight = None
+
+
+class InferenceDispatcher:
+    """
+    Process-wide gate in front of the inference endpoints, shared by every session.
+
+    Generation requests queue per endpoint and at most `max_concurrency_per_endpoint`
+    completions run against one endpoint at a time; the server batches whatever is
+    in flight. Identical prompts sent to the same client while a completion is
+    running join it instead of starting another one, and every waiter receives the
+    same chunks. All bookkeeping runs on the BackgroundLoop, so it needs no locks.
+    """
+    DEFAULT_SETTINGS = {
+        'max_concurrency_per_endpoint': 4,
+        'coalesce': True,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _semaphores = {}  # endpoint -> asyncio.Semaphore (bound to the background loop)
+    _inflight = {}  # (client key, prompt) -> _Flight
+    _stats = {}  # endpoint -> counters
+
+    @classmethod
+    def configure(cls, dispatcher_config):
+        """Apply the `dispatcher` section of config.yaml. Only affects endpoints first used afterwards."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(dispatcher_config or {})}
+
+    @classmethod
+    def _endpoint_stats(cls, endpoint):
+        return cls._stats.setdefault(endpoint, {
+            'requests': 0, 'coalesced': 0, 'started': 0, 'queued': 0, 'running': 0,
+            'queue_wait_total_ms': 0.0, 'queue_wait_max_ms': 0.0,
+        })
+
+    @classmethod
+    def _semaphore(cls, endpoint):
+        semaphore = cls._semaphores.get(endpoint)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(int(cls.settings['max_concurrency_per_endpoint']))
+            cls._semaphores[endpoint] = semaphore
+        return semaphore
+
+    @staticmethod
+    def _publish(flight, item):
+        for deliver in list(flight.subscribers):
+            deliver(item)
+
+    @classmethod
+    async def _generate(cls, flight, llm, prompt):
+        stats = cls._endpoint_stats(flight.endpoint)
+        stats['queued'] += 1
+        queued_at = time.perf_counter()
+        try:
+            async with cls._semaphore(flight.endpoint):
+                wait_ms = (time.perf_counter() - queued_at) * 1000
+                stats['queued'] -= 1
+                queued_at = None
+                stats['started'] += 1
+                stats['running'] += 1
+                stats['queue_wait_total_ms'] += wait_ms
+                stats['queue_wait_max_ms'] = max(stats['queue_wait_max_ms'], wait_ms)
+                if wait_ms >= 1:
+                    logger.info("Waited %.0f ms for a free slot on %s", wait_ms, flight.endpoint)
+                try:
+                    async for chunk in llm.astream(prompt):
+                        flight.chunks.append(chunk)
+                        cls._publish(flight, chunk)
+                finally:
+                    stats['running'] -= 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            if queued_at is not None:
+                stats['queued'] -= 1
+            flight.finished = True
+            if cls._inflight.get(flight.key) is flight:
+                del cls._inflight[flight.key]
+            cls._publish(flight, _DONE)
+
+    @classmethod
+    async def _join(cls, model_config, llm, prompt, subscription):
+        """Subscribe the caller to a running completion for this prompt, or start one."""
+        endpoint = model_config.endpoint
+        key = (ModelFactory.client_key(model_config), prompt)
+        stats = cls._endpoint_stats(endpoint)
+        stats['requests'] += 1
+        flight = cls._inflight.get(key) if cls.settings['coalesce'] else None
+        if flight is not None:
+            stats['coalesced'] += 1
+            logger.info("Joined an in-flight completion on %s (%d waiters)", endpoint, len(flight.subscribers) + 1)
+        else:
+            flight = _Flight(key, endpoint)
+            if cls.settings['coalesce']:
+                cls._inflight[key] = flight
+            flight.task = asyncio.create_task(cls._generate(flight, llm, prompt))
+        for chunk in flight.chunks:
+            subscription.deliver(chunk)
+        flight.subscribers.add(subscription.deliver)
+        subscription.flight = flight
+        return flight
+
+    @classmethod
+    def _leave(cls, subscription):
+        """Unsubscribe a caller; the upstream call is cancelled once nobody is waiting on it."""
+        flight = subscription.flight
+        if flight is None:
+            return  # cancelled before it joined
+        flight.subscribers.discard(subscription.deliver)
+        if not flight.subscribers and not flight.finished:
+            if cls._inflight.get(flight.key) is flight:
+                del cls._inflight[flight.key]
+            flight.task.cancel()
+
+    @classmethod
+    async def stream(cls, model_config, llm, prompt):
+        """Yield the completion chunks for `prompt` into the caller's event loop."""
+        caller_loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def deliver(item):
+            try:
+                caller_loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # the consumer's loop is already closed
+
+        subscription = _Subscription(deliver)
+        try:
+            # Inside the try: a caller cancelled while joining must still leave, or the flight would
+            # keep generating for nobody. _leave is queued behind _join on the background loop.
+            flight = await BackgroundLoop.run(cls._join(model_config, llm, prompt, subscription))
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                yield item
+        finally:
+            BackgroundLoop.get_loop().call_soon_threadsafe(cls._leave, subscription)
+
+    @classmethod
+    def stats(cls):
+        """Per-endpoint request, coalescing and queue-wait counters."""
+        stats = {}
+        for endpoint, counters in list(cls._stats.items()):
+            entry = dict(counters)
+            entry['queue_wait_avg_ms'] = round(entry['queue_wait_total_ms'] / entry['started'], 1) if entry['started'] else 0.0
+            stats[endpoint] = entry
+        return stats
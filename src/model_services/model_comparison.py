@@ -1,5 +1,6 @@
 import streamlit as st
 import threading
+import asyncio
 from model_services.model_config import ModelConfig
 from config_manager import ConfigManager
 
@@ -102,30 +103,56 @@ class ModelComparison:
         # for col, (model_name, messages) in zip(cols, results.items()):
 
     async def display_results(self, user_input, results, model_configs):
+        """Run every selected architecture concurrently, each streaming into its own column."""
         logger.info("Displaying model comparison results...")
         cols = st.columns(self.number_of_models)
-        logger.info(f"No of models: {self.number_of_models}")
-        logger.info(f"Results: {results}")
-        logger.info(f"Total number of columns: {len(cols)}")
+        logger.debug("No of models: %d, columns: %d", self.number_of_models, len(cols))
         if len(cols) != len(results):
             logger.error("Mismatch in number of columns and results")
+        chatbot = st.session_state["chatbot"]
+        # Query embedding, retrieval and rerank run once for this query, shared by every column that needs them
+        retrieval = chatbot.retrieval_stage(user_input, model_configs)
+        tasks = []
         for model_index, (col, (model_name, messages)) in enumerate(zip(cols, results.items())):
-        # for model_index, (col, (model_name, messages)) in enumerate(zip(cols, results.items())):
-            logger.info(f"Model Index: {model_index}")
             with col:
-                logger.info(f"COLUMN: {col}")
                 st.markdown(f"#### Output from {model_name}")
-
-                # Assuming the Chatbot class's conversational_chat method is modified to accept config_index
-                with st.chat_message("user"):
-                    output = await st.session_state["chatbot"].conversational_chat(user_input, model_configs, model_index)
+                # Reserve the output slot before the history so the layout does not depend on which column finishes first
+                output_container = st.chat_message("user")
 
                 # Display each message
                 for msg in messages:
-                    start_idx = msg.find("content=") + len("content=")
-                    message_content = msg[start_idx:].strip("'")
-                    st.write(message_content) 
-        # for col, (model_name, messages) in zip(cols, results.items()):
+                    st.write(msg['content'])
+            tasks.append(asyncio.create_task(
+                self.run_column(chatbot, user_input, model_configs, model_index, output_container, retrieval),
+                name=f"comparison-{model_name}"
+            ))
+
+        try:
+            outputs = await asyncio.gather(*tasks)
+        finally:
+            # Only reached with pending tasks if the script itself is being stopped
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            retrieval.cancel()
+        return dict(zip(results.keys(), outputs))
+
+    @staticmethod
+    async def run_column(chatbot, user_input, model_configs, model_index, container, retrieval=None):
+        """Run one architecture, cancelling it if it exceeds its configured timeout."""
+        model_config = model_configs[model_index]
+        try:
+            return await asyncio.wait_for(
+                chatbot.conversational_chat(user_input, model_configs, model_index, container, retrieval),
+                timeout=model_config.timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("%s timed out after %s seconds", model_config.id, model_config.timeout)
+            container.warning(f"No response from {model_config.name} within {model_config.timeout} seconds.")
+        except Exception as e:
+            logger.error("Error from %s: %s", model_config.id, e)
+            container.error(f"Error from {model_config.name}: {e}")
+        return None
 
     async def old_display_results(self, user_input, results, model_configs):
         cols = st.columns(len(results))
@@ -176,5 +203,5 @@ class ModelComparison:
         return model_comparison_tool.run_model_comparisons(model_configs)
 
     async def display_model_comparison_results(model_comparison_tool, user_input, results, model_configs):
-        """Display the results of model comparisons."""
-        await model_comparison_tool.display_results(user_input, results, model_configs)
+        """Display the results of model comparisons, returning each architecture's answer."""
+        return await model_comparison_tool.display_results(user_input, results, model_configs)
@@ -1,17 +1,24 @@
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
 class ModelConfig:
     """
-    Class to store model configuration details.
+    Immutable model configuration details, built once per config.yaml version and shared across reruns.
     """
-    def __init__(self, name, description, endpoint, uses_rag, model_name=None, type='ollama', id=None, model_source=None, uses_reranking=False):
-        self.id = id
-        self.name = name
-        self.description = description
-        self.endpoint = endpoint
-        self.uses_rag = uses_rag
-        self.uses_reranking = uses_reranking
-        self.model_name = model_name
-        self.type = type
-        self.model_source = model_source
+    name: str
+    description: str
+    endpoint: str
+    uses_rag: bool
+    model_name: str = None
+    type: str = 'ollama'
+    id: str = None
+    model_source: str = None
+    uses_reranking: bool = False
+    timeout: float = 120
+    context_token_budget: int = 1536
+    retrieval_k: int = 10
+    distance_threshold: float = None
 
     def __str__(self):
-            return f"ModelConfig(name={self.name}, description={self.description}, endpoint={self.endpoint}, uses_rag={self.uses_rag}, model_name={self.model_name}, type={self.type}), id={self.id}, model_source={self.model_source}, uses_reranking={self.uses_reranking}"
+            return f"ModelConfig(name={self.name}, description={self.description}, endpoint={self.endpoint}, uses_rag={self.uses_rag}, model_name={self.model_name}, type={self.type}), id={self.id}, model_source={self.model_source}, uses_reranking={self.uses_reranking}, timeout={self.timeout}, context_token_budget={self.context_token_budget}, retrieval_k={self.retrieval_k}, distance_threshold={self.distance_threshold}"
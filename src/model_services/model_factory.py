@@ -26,7 +26,7 @@
 
 # model_factory.py
 
-import os
+import threading
 from langchain_community.llms import HuggingFaceTextGenInference, Ollama
 from langchain_openai import OpenAI, ChatOpenAI
 
@@ -39,17 +39,44 @@ OPENAI_API_KEY = "dummy"
 class ModelFactory:
     """ Factory class for creating inference models based on specific configurations. """
 
+    # One client per distinct (type, endpoint, model_name, params), shared by every session and rerun.
+    # Each client keeps its own persistent HTTP connection pool; the async side is only used from
+    # BackgroundLoop so those connections outlive the per-rerun event loops.
+    _clients = {}
+    _lock = threading.Lock()
+
+    GENERATION_PARAMS = ('max_new_tokens', 'top_k', 'top_p', 'typical_p', 'temperature', 'repetition_penalty', 'streaming', 'verbose')
+
+    @staticmethod
+    def client_key(model_config):
+        """Key identifying the client a configuration needs; architectures sharing an endpoint and model share a client."""
+        params = tuple((name, getattr(model_config, name, None)) for name in ModelFactory.GENERATION_PARAMS)
+        return (getattr(model_config, 'type', "ollama"), getattr(model_config, 'endpoint', None), getattr(model_config, 'model_name', None), params)
+
+    @staticmethod
+    def get_inference_model(model_config):
+        """Return the pooled inference model for this configuration, creating it on first use."""
+        key = ModelFactory.client_key(model_config)
+        with ModelFactory._lock:
+            model = ModelFactory._clients.get(key)
+            if model is None:
+                model = ModelFactory.create_inference_model(model_config)
+                if model is not None:
+                    ModelFactory._clients[key] = model
+                    logger.info("Created %s client for %s at %s", key[0], key[2], key[1])
+            return model
+
     @staticmethod
     def create_inference_model(model_config):
         """Create and return an inference model based on the provided configuration."""
         # Assuming model_config is an instance of ModelConfig, not a dictionary
         model_type = model_config.type if hasattr(model_config, 'type') else "ollama"
-        logger.debug("Configuration received for model creation:", model_config)  # Debug output
+        logger.debug("Configuration received for model creation: %s", model_config)  # Debug output
 
         if model_type == "ollama":
             model_name = model_config.model_name if hasattr(model_config, 'model_name') else "mixtral"
             logger.debug(f"Creating Ollama model with {model_name}...")
-            return Ollama(model=model_name)
+            return Ollama(model=model_name, base_url=getattr(model_config, 'endpoint', None) or "http://localhost:11434")
         elif model_type == "hf":
             # Ensure model_name is defined before use
             model_name = getattr(model_config, 'model_name', 'default_model_name')
@@ -68,7 +95,7 @@ class ModelFactory:
             )
         elif model_type == "instruct":
             model_name = model_config.model_name if hasattr(model_config, 'model_name') else "mixtral"
-            # Use LangChain's OpenAI LLM, but with a custom OPENAI_API_BASE value
-            os.environ['OPENAI_API_BASE'] = getattr(model_config, 'endpoint', "http://localhost:8000")
+            # Use LangChain's OpenAI LLM with a per-client API base, rather than the process-wide OPENAI_API_BASE
+            openai_api_base = getattr(model_config, 'endpoint', "http://localhost:8000")
             openai_api_key=OPENAI_API_KEY
-            return ChatOpenAI(model=model_name, openai_api_key=openai_api_key)
+            return ChatOpenAI(model=model_name, openai_api_key=openai_api_key, openai_api_base=openai_api_base)
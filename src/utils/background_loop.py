@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class BackgroundLoop:
+    """
+    A process-wide event loop running on a daemon thread.
+
+    Each Streamlit rerun executes in a fresh event loop that is closed when the
+    script finishes, which breaks any pooled async connection opened in it.
+    Long-lived async clients (the LLM HTTP clients in ModelFactory) are only
+    ever used from this loop, so their connections survive across reruns and
+    are shared by every session.
+    """
+    _loop = None
+    _thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_loop(cls):
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                cls._thread = threading.Thread(target=cls._loop.run_forever, name="background-loop", daemon=True)
+                cls._thread.start()
+            return cls._loop
+
+    @classmethod
+    def submit(cls, coro):
+        """Schedule a coroutine on the background loop and return a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, cls.get_loop())
+
+    @classmethod
+    async def run(cls, coro):
+        """Await a coroutine that runs on the background loop. Cancelling the caller cancels it."""
+        return await asyncio.wrap_future(cls.submit(coro))
@@ -0,0 +1,188 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from embeddings.pdf_pages import count_pages, extract_page_range
+from utils.executors import Executors
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+PDF_TYPE = "application/pdf"
+TEXT_TYPE = "text/plain"
+DOCX_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def read_text(file):
+    return file.getvalue().decode("utf-8")
+
+
+def read_docx(file):
+    import docx
+    doc = docx.Document(file)
+    text = [paragraph.text for paragraph in doc.paragraphs]
+    return "\n".join(text)
+
+
+class ParsedDocument:
+    """
+    An uploaded file as the app sees it: content hash and page count. Page text
+    is only extracted for ingestion, streamed from the file's bytes by
+    `iter_pages` and never held for the whole document.
+    """
+    def __init__(self, file_hash, name, file_type, page_count, data):
+        self.file_hash = file_hash
+        self.name = name
+        self.file_type = file_type
+        self.page_count = page_count
+        self.data = data
+
+    def iter_pages(self):
+        """Yield the text of each page in order, PDFs through the shared process pool."""
+        if self.file_type != PDF_TYPE:
+            yield DocumentParser._extract_text(self.data, self.file_type)
+            return
+        with DocumentParser.pdf_file(self.data) as path:
+            for _, text in DocumentParser.iter_pdf_pages(path, self.page_count):
+                yield text
+
+
+class DocumentParser:
+    """
+    Inspects each uploaded file once and memoizes its page count by content
+    hash, across Streamlit reruns and sessions. No text is extracted until
+    ingestion streams the pages with bounded memory, so no cached entry holds
+    any of the document.
+    """
+    DEFAULT_SETTINGS = {
+        'workers': min(4, os.cpu_count() or 1),
+        'pages_per_task': 8,
+        'max_pending_tasks': 4,
+        'parsed_cache_size': 32,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _cache = OrderedDict()  # content hash -> page count
+    _lock = threading.Lock()
+    _key_locks = {}
+    _process_pool = None
+
+    @classmethod
+    def configure(cls, ingestion_config):
+        """Apply the `ingestion` section of config.yaml."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(ingestion_config or {})}
+
+    @classmethod
+    def load(cls, uploaded_file):
+        """
+        Like `parse`, for the script thread: a memoized file is returned straight away, and
+        only a new one is parsed in the shared CPU pool, which bounds the parsing all sessions do at once.
+        """
+        data = uploaded_file.getvalue()
+        file_hash = hashlib.sha256(data).hexdigest()
+        page_count = cls._cached(file_hash)
+        if page_count is not None:
+            return ParsedDocument(file_hash, uploaded_file.name, uploaded_file.type, page_count, data)
+        return Executors.cpu().call(cls.parse, uploaded_file)
+
+    @classmethod
+    def parse(cls, uploaded_file):
+        """Return the ParsedDocument for a Streamlit UploadedFile, counting its pages only on first sight."""
+        data = uploaded_file.getvalue()
+        file_hash = hashlib.sha256(data).hexdigest()
+        page_count = cls._cached(file_hash)
+        if page_count is None:
+            with cls._lock:
+                key_lock = cls._key_locks.setdefault(file_hash, threading.Lock())
+            with key_lock:
+                page_count = cls._cached(file_hash)
+                if page_count is None:
+                    page_count = cls._count_pages(data, uploaded_file.type)
+                    with cls._lock:
+                        cls._cache[file_hash] = page_count
+                        while len(cls._cache) > cls.settings['parsed_cache_size']:
+                            evicted, _ = cls._cache.popitem(last=False)
+                            cls._key_locks.pop(evicted, None)
+                    logger.info("Parsed %s: %s pages", uploaded_file.name, page_count)
+        return ParsedDocument(file_hash, uploaded_file.name, uploaded_file.type, page_count, data)
+
+    @classmethod
+    def _cached(cls, file_hash):
+        with cls._lock:
+            page_count = cls._cache.get(file_hash)
+            if page_count is not None:
+                cls._cache.move_to_end(file_hash)
+            return page_count
+
+    @classmethod
+    def _count_pages(cls, data, file_type):
+        """Text and DOCX files are ingested as a single page."""
+        if file_type != PDF_TYPE:
+            if file_type not in (TEXT_TYPE, DOCX_TYPE):
+                raise ValueError(f"Unsupported file type: {file_type}")
+            return 1
+        with cls.pdf_file(data) as path:
+            return count_pages(path)
+
+    @staticmethod
+    def _extract_text(data, file_type):
+        if file_type == TEXT_TYPE:
+            return read_text(io.BytesIO(data))
+        elif file_type == DOCX_TYPE:
+            return read_docx(io.BytesIO(data))
+        raise ValueError(f"Unsupported file type: {file_type}")
+
+    @staticmethod
+    @contextmanager
+    def pdf_file(data):
+        """The PDF bytes as a temporary file, since worker processes need a path to open."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
+            tmp_file.write(data)
+            tmp_file_path = tmp_file.name
+        try:
+            yield tmp_file_path
+        finally:
+            os.remove(tmp_file_path)
+
+    @classmethod
+    def process_pool(cls):
+        """Process pool shared by all sessions. Spawned, so workers never inherit torch or Streamlit state."""
+        with cls._lock:
+            if cls._process_pool is None:
+                cls._process_pool = ProcessPoolExecutor(max_workers=cls.settings['workers'],
+                                                        mp_context=multiprocessing.get_context("spawn"))
+            return cls._process_pool
+
+    @classmethod
+    def iter_pdf_pages(cls, path, total_pages=None):
+        """Yield (page_index, text) in order, keeping a bounded number of page ranges in flight."""
+        if total_pages is None:
+            total_pages = count_pages(path)
+        pages_per_task = cls.settings['pages_per_task']
+        ranges = iter([(start, min(start + pages_per_task, total_pages))
+                       for start in range(0, total_pages, pages_per_task)])
+        pool = cls.process_pool()
+
+        pending = deque()
+        for start, stop in ranges:
+            pending.append((start, pool.submit(extract_page_range, path, start, stop)))
+            if len(pending) >= cls.settings['max_pending_tasks']:
+                break
+        try:
+            while pending:
+                start, future = pending.popleft()
+                next_range = next(ranges, None)
+                if next_range:
+                    pending.append((next_range[0], pool.submit(extract_page_range, path, *next_range)))
+                for offset, text in enumerate(future.result()):
+                    yield start + offset, text
+        finally:
+            # Stopped early (e.g. ingestion failed): drop the ranges not started yet
+            for _, future in pending:
+                future.cancel()
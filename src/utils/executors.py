@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when no slot frees up in a pool within its queue timeout."""
+
+
+class BoundedExecutor:
+    """
+    A thread pool that accepts at most `max_workers + max_queued` tasks at a time.
+
+    Submitting beyond that waits for a slot (blocking for sync callers, yielding
+    the event loop for async ones) and raises ExecutorSaturated after
+    `queue_timeout` seconds, instead of letting the backlog grow without bound.
+    A freed slot is handed straight to the longest waiter, so neither kind of
+    caller polls.
+    """
+    def __init__(self, name, max_workers, max_queued, queue_timeout):
+        self.name = name
+        self.max_workers = max_workers
+        self.capacity = max_workers + max_queued
+        self.queue_timeout = queue_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._free = self.capacity
+        self._waiters = deque()  # concurrent.futures.Future per caller waiting for a slot
+        self._pending = 0
+        self._rejected = 0
+
+    def _claim_slot(self):
+        """Take a free slot and return None, or return a future that resolves once a slot is handed over."""
+        with self._lock:
+            if self._free:
+                self._free -= 1
+                return None
+            waiter = Future()
+            self._waiters.append(waiter)
+            return waiter
+
+    def _release_slot(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                # False when the waiter gave up (timed out or was cancelled)
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(None)
+                    return
+            self._free += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._pending -= 1
+        self._release_slot()
+
+    def _reject(self):
+        with self._lock:
+            self._rejected += 1
+        raise ExecutorSaturated(f"The {self.name} pool is saturated ({self.capacity} tasks pending)")
+
+    def _submit_acquired(self, fn, *args, **kwargs):
+        with self._lock:
+            self._pending += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit from synchronous code, blocking while the pool is saturated."""
+        waiter = self._claim_slot()
+        if waiter is not None:
+            try:
+                waiter.result(timeout=self.queue_timeout)
+            except FutureTimeoutError:
+                # cancel() fails if the slot was handed over in the meantime; then it is ours
+                if waiter.cancel():
+                    self._reject()
+        return self._submit_acquired(fn, *args, **kwargs)
+
+    def call(self, fn, *args, **kwargs):
+        """Run `fn` in the pool and wait for its result."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn` in the pool from a coroutine; other tasks keep running while it waits for a slot."""
+        waiter = self._claim_slot()
+        if waiter is not None:
+            try:
+                done, _ = await asyncio.wait([asyncio.wrap_future(waiter)], timeout=self.queue_timeout)
+            except asyncio.CancelledError:
+                if not waiter.cancel():
+                    self._release_slot()
+                raise
+            if not done and waiter.cancel():
+                self._reject()
+        return await asyncio.wrap_future(self._submit_acquired(functools.partial(fn, *args, **kwargs)))
+
+    def stats(self):
+        with self._lock:
+            return {'max_workers': self.max_workers, 'capacity': self.capacity,
+                    'pending': self._pending, 'rejected': self._rejected}
+
+
+class Executors:
+    """
+    Process-wide pools for blocking work, shared by every session: `cpu` for
+    embedding, reranking and parsing, `io` for blocking network calls such as
+    Redis writes. Keeping them separate stops slow I/O from occupying the
+    threads CPU-bound work needs, and the bounds keep one heavy upload from
+    queueing unbounded work ahead of other sessions' queries.
+    """
+    DEFAULT_SETTINGS = {
+        'cpu_workers': min(4, os.cpu_count() or 1),
+        'io_workers': 16,
+        'max_queued': 32,
+        'queue_timeout_seconds': 30,
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    _pools = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, executors_config):
+        """Apply the `executors` section of config.yaml. Only affects pools created afterwards."""
+        cls.settings = {**cls.DEFAULT_SETTINGS, **(executors_config or {})}
+
+    @classmethod
+    def _get(cls, name, workers_key):
+        with cls._lock:
+            pool = cls._pools.get(name)
+            if pool is None:
+                pool = BoundedExecutor(name, int(cls.settings[workers_key]), int(cls.settings['max_queued']),
+                                       cls.settings['queue_timeout_seconds'])
+                cls._pools[name] = pool
+                logger.info("Started the %s pool with %s workers", name, pool.max_workers)
+            return pool
+
+    @classmethod
+    def cpu(cls):
+        return cls._get("cpu", 'cpu_workers')
+
+    @classmethod
+    def io(cls):
+        return cls._get("io", 'io_workers')
+
+    @classmethod
+    def stats(cls):
+        with cls._lock:
+            pools = dict(cls._pools)
+        return {name: pool.stats() for name, pool in pools.items()}
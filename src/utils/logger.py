@@ -1,4 +1,9 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import queue
+import threading
 from termcolor import colored
 
 import yaml
@@ -14,7 +19,15 @@ def load_config():
 
 
 config = load_config()
-log_level = config['logging']['level']
+logging_config = (config or {}).get('logging') or {}
+log_level = logging_config.get('level', "INFO")
+log_file = logging_config.get('file', "debug.log")
+max_payload_chars = int(logging_config.get('max_payload_chars', 1000))
+
+LOG_FORMAT = "%(levelname)s: %(asctime)s - %(message)s"
+
+_lock = threading.Lock()
+
 
 class ColoredFormatter(logging.Formatter):
     """Formatter class to color log levels."""
@@ -27,27 +40,89 @@ class ColoredFormatter(logging.Formatter):
         'CRITICAL': 'magenta'
     }
 
+    def __init__(self, fmt=LOG_FORMAT):
+        # Color the level field itself instead of searching the formatted message for it
+        super().__init__(fmt.replace("%(levelname)s", "%(colored_levelname)s"))
+        self._colored = {level: colored(level, color) for level, color in self.COLORS.items()}
+
     def format(self, record):
-        local_log_level = record.levelname
-        log_message = super().format(record)
-        colored_level = colored(local_log_level, self.COLORS.get(local_log_level))
-        return log_message.replace(local_log_level, colored_level)
+        record.colored_levelname = self._colored.get(record.levelname, record.levelname)
+        return super().format(record)
 
-def setup_logging():
-    """Set up and return a logger with colored log levels."""
 
-    logging.basicConfig(
-        level=getattr(logging, log_level),
-        format="%(levelname)s: %(asctime)s - %(message)s",
-        handlers=[
-            logging.FileHandler("debug.log"),
-            logging.StreamHandler()
-        ]
-    )
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records unformatted: the message is merged with its arguments and
+    formatted by the listener thread, not the thread that logged it. Mutable
+    arguments (stats dicts, lists) are copied first, so the line shows them as
+    they were when logged.
+    """
+    def prepare(self, record):
+        if isinstance(record.args, dict):
+            record.args = _snapshot(record.args)
+        elif record.args:
+            record.args = tuple(_snapshot(arg) for arg in record.args)
+        return record
+
+
+_IMMUTABLE = (str, bytes, int, float, complex, bool, type(None), BaseException)
+
 
-    formatter = ColoredFormatter("%(levelname)s: %(asctime)s - %(message)s")
+def _snapshot(arg):
+    if isinstance(arg, _IMMUTABLE):
+        return arg
+    if isinstance(arg, Truncated):
+        return arg if isinstance(arg.value, _IMMUTABLE) else Truncated(_snapshot(arg.value), arg.limit)
+    try:
+        return copy.deepcopy(arg)
+    except Exception:
+        return str(arg)
+
+
+class Truncated:
+    """
+    Log argument that renders as at most `limit` characters, and only if the
+    record is actually emitted: logger.debug("Prompt: %s", Truncated(prompt)).
+    """
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit=None):
+        self.value = value
+        self.limit = max_payload_chars if limit is None else limit
+
+    def __str__(self):
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}... [{len(text) - self.limit} more characters]"
+
+
+def setup_logging():
+    """
+    Return the application logger, configuring it on the first call only.
+    Records are put on a queue and written to the log file and stderr by a
+    background listener thread.
+    """
+    root = logging.getLogger()
+    # Kept on the root logger, so a module reload (Streamlit's file watcher) does not configure twice
+    if getattr(root, "_queue_listener", None) is not None:
+        return root
+    with _lock:
+        if getattr(root, "_queue_listener", None) is not None:
+            return root
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(ColoredFormatter())
 
-    for handler in logging.getLogger().handlers:
-        handler.setFormatter(formatter)
+        log_queue = queue.SimpleQueue()
+        listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
 
-    return logging.getLogger()
\ No newline at end of file
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        root.setLevel(getattr(logging, log_level))
+        root._queue_listener = listener
+    return root
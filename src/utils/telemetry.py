@@ -0,0 +1,148 @@
+import contextlib
+import threading
+import time
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+_NOOP = contextlib.nullcontext()
+
+
+class _StageTimer:
+    """Times one stage into the latency histogram and, when tracing is on, an OpenTelemetry span."""
+    __slots__ = ("stage", "architecture", "attributes", "span_context", "start")
+
+    def __init__(self, stage, architecture, attributes):
+        self.stage = stage
+        self.architecture = architecture
+        self.attributes = attributes
+        self.span_context = None
+
+    def __enter__(self):
+        if Telemetry._tracer is not None:
+            attributes = {'architecture': self.architecture, **self.attributes}
+            self.span_context = Telemetry._tracer.start_as_current_span(self.stage, attributes=attributes)
+            self.span_context.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        Telemetry.record_stage(self.stage, self.architecture, time.perf_counter() - self.start)
+        if self.span_context is not None:
+            self.span_context.__exit__(exc_type, exc, tb)
+        return False
+
+
+class Telemetry:
+    """
+    Optional per-stage latency instrumentation, shared by every session.
+
+    With `enabled`, stage latencies, time to first token and tokens per second
+    are recorded as Prometheus histograms served on `/metrics` (needs
+    prometheus_client), and stages become OpenTelemetry spans exported over
+    OTLP/HTTP to `otlp_endpoint` (needs opentelemetry-sdk and
+    opentelemetry-exporter-otlp-proto-http). Either part is skipped if its
+    package is missing. When disabled, `span` returns a shared no-op context
+    and the record methods return immediately.
+    """
+    DEFAULT_SETTINGS = {
+        'enabled': False,
+        'metrics_port': 9464,  # 0 disables the /metrics server
+        'otlp_endpoint': None,  # e.g. http://localhost:4318/v1/traces
+        'service_name': "summit-instructlab-demo",
+    }
+
+    settings = dict(DEFAULT_SETTINGS)
+    enabled = False
+    _configured = False
+    _lock = threading.Lock()
+    _tracer = None
+    _stage_seconds = None
+    _ttft_seconds = None
+    _tokens_per_second = None
+    _pool_connections = None
+
+    @classmethod
+    def configure(cls, telemetry_config):
+        """Apply the `telemetry` section of config.yaml. Metrics and exporters are set up once per process."""
+        with cls._lock:
+            if cls._configured:
+                return
+            cls._configured = True
+            cls.settings = {**cls.DEFAULT_SETTINGS, **(telemetry_config or {})}
+            if not cls.settings['enabled']:
+                return
+            cls._setup_metrics()
+            cls._setup_tracing()
+            cls.enabled = cls._stage_seconds is not None or cls._tracer is not None
+
+    @classmethod
+    def _setup_metrics(cls):
+        try:
+            from prometheus_client import Gauge, Histogram, start_http_server
+        except ImportError:
+            logger.warning("prometheus_client is not installed, latency metrics are disabled")
+            return
+        latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+        cls._stage_seconds = Histogram("chat_stage_seconds", "Latency of each stage of answering a query",
+                                       ["stage", "architecture"], buckets=latency_buckets)
+        cls._ttft_seconds = Histogram("llm_time_to_first_token_seconds", "Time from sending the prompt to the first streamed chunk",
+                                      ["architecture"], buckets=latency_buckets)
+        cls._tokens_per_second = Histogram("llm_tokens_per_second", "Streamed chunks per second after the first one",
+                                           ["architecture"], buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200))
+        cls._pool_connections = Gauge("redis_pool_connections", "Connections of the shared Redis pools",
+                                      ["pool", "state"])
+        if cls.settings['metrics_port']:
+            start_http_server(int(cls.settings['metrics_port']))
+            logger.info("Serving Prometheus metrics on :%s/metrics", cls.settings['metrics_port'])
+
+    @classmethod
+    def _setup_tracing(cls):
+        if not cls.settings['otlp_endpoint']:
+            return
+        try:
+            from opentelemetry import trace
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            logger.warning("opentelemetry-sdk or its OTLP exporter is not installed, tracing is disabled")
+            return
+        provider = TracerProvider(resource=Resource.create({"service.name": cls.settings['service_name']}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=cls.settings['otlp_endpoint'])))
+        trace.set_tracer_provider(provider)
+        cls._tracer = trace.get_tracer(__name__)
+        logger.info("Exporting spans to %s", cls.settings['otlp_endpoint'])
+
+    @classmethod
+    def span(cls, stage, architecture="shared", **attributes):
+        """Context manager timing one stage; `architecture` is the ModelConfig id, or "shared" for shared work."""
+        if not cls.enabled:
+            return _NOOP
+        return _StageTimer(stage, architecture or "shared", attributes)
+
+    @classmethod
+    def record_stage(cls, stage, architecture, seconds):
+        """Record the latency of a stage timed elsewhere."""
+        if cls._stage_seconds is not None:
+            cls._stage_seconds.labels(stage=stage, architecture=architecture or "shared").observe(seconds)
+
+    @classmethod
+    def record_generation(cls, architecture, ttft_seconds, chunks, stream_seconds):
+        """Record time to first token and the streaming rate of one completion."""
+        if cls._ttft_seconds is None or ttft_seconds is None:
+            return
+        cls._ttft_seconds.labels(architecture=architecture).observe(ttft_seconds)
+        generation_seconds = stream_seconds - ttft_seconds
+        if chunks > 1 and generation_seconds > 0:
+            cls._tokens_per_second.labels(architecture=architecture).observe((chunks - 1) / generation_seconds)
+
+    @classmethod
+    def record_pool_stats(cls, pool_stats):
+        """Export RedisManager.pool_stats() as gauges."""
+        if cls._pool_connections is None:
+            return
+        for pool, usage in pool_stats.items():
+            for state in ("in_use", "idle", "max_connections"):
+                cls._pool_connections.labels(pool=pool, state=state).set(usage[state])
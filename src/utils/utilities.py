@@ -5,24 +5,9 @@ from yaml.loader import SafeLoader
 import os
 import tempfile
 
-class Utilities:    
-    def read_pdf(file):
-        import PyPDF2
-        reader = PyPDF2.PdfReader(file)
-        text = []
-        for page in reader.pages:
-            text.append(page.extract_text())
-        return "\n".join(text)
-
-    def read_text(file):
-        return file.getvalue().decode("utf-8")
+from utils.document_parser import DocumentParser
 
-    def read_docx(file):
-        import docx
-        doc = docx.Document(file)
-        text = [paragraph.text for paragraph in doc.paragraphs]
-        return "\n".join(text)
-    
+class Utilities:    
 
     # @staticmethod
     # def attempt_pdf_upload(upload_handler):
@@ -58,18 +43,14 @@ class Utilities:
     def handle_file_upload():
         """
         Handles the file upload process, displays the uploaded file,
-        and returns the file and its content if successful.
+        and returns the file and its page count if successful.
         """
         st.spinner("Uploading file...")
         uploaded_file = st.sidebar.file_uploader("Upload a file", type=['pdf', 'txt', 'docx'], label_visibility="collapsed")
         if uploaded_file:
-            if uploaded_file.type == "application/pdf":
-                doc_content = Utilities.read_pdf(uploaded_file)
-            elif uploaded_file.type == "text/plain":
-                doc_content = Utilities.read_text(uploaded_file)
-            elif uploaded_file.type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-                doc_content = Utilities.read_docx(uploaded_file)
-            return uploaded_file, doc_content
+            # Inspected once per file content; reruns and the embedding step reuse the result
+            page_count = DocumentParser.load(uploaded_file).page_count
+            return uploaded_file, page_count
         else:
             st.sidebar.info(
                 "Upload a PDF file to get started", icon="👆"
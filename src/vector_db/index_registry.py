@@ -0,0 +1,145 @@
+import time
+
+from redis.exceptions import ResponseError, WatchError
+
+from vector_db.redis_manager import RedisManager
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+
+class IndexRegistry:
+    """
+    Tracks which sessions use each content-addressed document index and
+    garbage-collects indexes nobody has used for a while.
+
+    Streamlit has no session-end hook, so references are leases: each index
+    keeps a sorted set of session id -> lease expiry, pushed out by
+    `lease_ttl_seconds` on every query. The reference count is the number of
+    unexpired leases, counted with one ZCOUNT.
+
+    An index only counts as built once its `ready` marker is set, after the
+    whole document was ingested; an index defined without it is a failed (or
+    crashed) build and is dropped and rebuilt by the next session.
+    """
+    REGISTRY_KEY = "doc_index:registry"  # sorted set of index name -> last use timestamp
+    LEASE_PREFIX = "doc_index:leases:"  # per index: sorted set of session id -> lease expiry timestamp
+    LOCK_PREFIX = "doc_index:lock:"
+    READY_PREFIX = "doc_index:ready:"
+
+    def __init__(self, redis_url, lease_ttl_seconds=3600, idle_ttl_seconds=86400, lock_timeout_seconds=120, lock_wait_seconds=1800):
+        self.client = RedisManager.get_client(redis_url)
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.lock_timeout_seconds = lock_timeout_seconds
+        self.lock_wait_seconds = lock_wait_seconds
+
+    def _lease_key(self, index_name):
+        return f"{self.LEASE_PREFIX}{index_name}"
+
+    def index_exists(self, index_name):
+        try:
+            self.client.ft(index_name).info()
+            return True
+        except ResponseError:
+            return False
+
+    def is_ready(self, index_name):
+        """True once the index holds the whole document."""
+        return bool(self.client.exists(f"{self.READY_PREFIX}{index_name}"))
+
+    def mark_ready(self, index_name):
+        self.client.set(f"{self.READY_PREFIX}{index_name}", 1)
+
+    def discard(self, index_name):
+        """Drop an incomplete index and its documents, so the next session builds it from scratch."""
+        self.client.delete(f"{self.READY_PREFIX}{index_name}")
+        if self.index_exists(index_name):
+            self.client.ft(index_name).dropindex(delete_documents=True)
+            logger.warning("Dropped incomplete index %s", index_name)
+
+    def creation_lock(self, index_name):
+        """
+        Lock held while an index is being built so two sessions uploading the same file do not both ingest it.
+        It expires after `lock_timeout_seconds` unless the builder calls `reacquire()` on it as the build progresses,
+        so a build of any size keeps it while a crashed one frees it quickly.
+        """
+        # Not thread-local: the build may extend it from the thread reporting progress
+        return self.client.lock(f"{self.LOCK_PREFIX}{index_name}", timeout=self.lock_timeout_seconds,
+                                blocking_timeout=self.lock_wait_seconds, thread_local=False)
+
+    def acquire(self, index_name, session_id):
+        """Take or refresh this session's lease on the index."""
+        now = time.time()
+        lease_key = self._lease_key(index_name)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zadd(lease_key, {session_id or "anonymous": now + self.lease_ttl_seconds})
+        pipe.zremrangebyscore(lease_key, "-inf", now)  # lapsed leases
+        pipe.expire(lease_key, self.lease_ttl_seconds)
+        pipe.zadd(self.REGISTRY_KEY, {index_name: now})
+        pipe.execute()
+
+    def release(self, index_name, session_id):
+        pipe = self.client.pipeline(transaction=False)
+        pipe.zrem(self._lease_key(index_name), session_id or "anonymous")
+        pipe.zadd(self.REGISTRY_KEY, {index_name: time.time()})
+        pipe.execute()
+
+    def reference_count(self, index_name):
+        return self.client.zcount(self._lease_key(index_name), time.time(), "+inf")
+
+    def drop(self, index_name):
+        """
+        Drop an index, its documents and its bookkeeping. It stays registered if the
+        drop fails, so a later collection retries it instead of orphaning it.
+        """
+        if self.index_exists(index_name):
+            try:
+                self.client.ft(index_name).dropindex(delete_documents=True)
+            except ResponseError as e:
+                logger.warning("Could not drop index %s: %s", index_name, e)
+                return False
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(f"{self.READY_PREFIX}{index_name}", self._lease_key(index_name))
+        pipe.zrem(self.REGISTRY_KEY, index_name)
+        pipe.execute()
+        return True
+
+    def drop_if_unused(self, index_name):
+        """
+        Drop an index only if it has no live lease, checked and dropped in one transaction:
+        a session taking a lease in between aborts the drop, leaving the index for a later collection.
+        """
+        lease_key = self._lease_key(index_name)
+        with self.client.pipeline(transaction=True) as pipe:
+            try:
+                pipe.watch(lease_key)
+                if pipe.zcount(lease_key, time.time(), "+inf"):
+                    return False
+                registered_at = pipe.zscore(self.REGISTRY_KEY, index_name)
+                pipe.multi()
+                pipe.execute_command("FT.DROPINDEX", index_name, "DD")
+                pipe.delete(f"{self.READY_PREFIX}{index_name}", lease_key)
+                pipe.zrem(self.REGISTRY_KEY, index_name)
+                dropped = pipe.execute(raise_on_error=False)[0]
+            except WatchError:
+                logger.info("Index %s was leased during collection, keeping it", index_name)
+                return False
+        if isinstance(dropped, ResponseError) and self.index_exists(index_name):
+            # Keep it registered, so a later collection retries it instead of orphaning it
+            logger.warning("Could not drop index %s: %s", index_name, dropped)
+            self.client.zadd(self.REGISTRY_KEY, {index_name: registered_at or time.time()})
+            return False
+        return True
+
+    def collect_garbage(self):
+        """Drop indexes, and their documents, that have no live leases and have been idle longer than the TTL."""
+        cutoff = time.time() - self.idle_ttl_seconds
+        dropped = []
+        for name in self.client.zrangebyscore(self.REGISTRY_KEY, "-inf", cutoff):
+            index_name = name.decode()
+            if self.drop_if_unused(index_name):
+                dropped.append(index_name)
+        if dropped:
+            logger.info("Dropped unused indexes: %s", dropped)
+        return dropped
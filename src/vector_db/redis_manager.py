@@ -1,4 +1,87 @@
+import threading
+import weakref
+
+import redis
+import redis.asyncio
+
+from utils.background_loop import BackgroundLoop
+
+
+class _ConnectionUsage:
+    """
+    Counts a pool's checked-out connections from its public get_connection/release
+    calls, so usage can be reported without reading redis-py's private fields.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_use = 0
+        self.seen = weakref.WeakSet()  # every connection handed out and not yet garbage-collected
+
+    def checked_out(self, connection):
+        with self.lock:
+            self.in_use += 1
+            self.seen.add(connection)
+
+    def checked_in(self):
+        with self.lock:
+            self.in_use = max(self.in_use - 1, 0)
+
+    def snapshot(self):
+        with self.lock:
+            return self.in_use, max(len(self.seen) - self.in_use, 0)
+
+
+class _TrackedPool(redis.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        self.usage = _ConnectionUsage()
+        super().__init__(*args, **kwargs)
+
+    def get_connection(self, *args, **kwargs):
+        connection = super().get_connection(*args, **kwargs)
+        self.usage.checked_out(connection)
+        return connection
+
+    def release(self, connection):
+        self.usage.checked_in()
+        return super().release(connection)
+
+
+class _TrackedAsyncPool(redis.asyncio.BlockingConnectionPool):
+    def __init__(self, *args, **kwargs):
+        self.usage = _ConnectionUsage()
+        super().__init__(*args, **kwargs)
+
+    async def get_connection(self, *args, **kwargs):
+        connection = await super().get_connection(*args, **kwargs)
+        self.usage.checked_out(connection)
+        return connection
+
+    def release(self, connection):
+        self.usage.checked_in()
+        return super().release(connection)  # awaited by the caller where redis-py makes it a coroutine
+
+
 class RedisManager:
+    """
+    Builds the Redis connection URL and owns the process-wide connection pools
+    that every vector store, cache and history client borrows from.
+    """
+    DEFAULT_POOL_SETTINGS = {
+        'max_connections': 50,
+        'timeout': 5,  # seconds to wait for a free connection when the pool is saturated
+        'health_check_interval': 30,
+        'socket_timeout': 5,
+        'socket_connect_timeout': 5,
+    }
+
+    pool_settings = dict(DEFAULT_POOL_SETTINGS)
+    _pools = {}
+    # asyncio connections are bound to the loop that opened them and each Streamlit
+    # rerun runs in a fresh loop, so the async pools live on the process-wide
+    # BackgroundLoop and every async Redis call is run there (see `run`).
+    _async_pools = {}
+    _lock = threading.Lock()
+
     @staticmethod
     def build_redis_connection_url(redis_config):
         """Build and return a Redis connection URL from the given configuration."""
@@ -9,3 +92,66 @@ class RedisManager:
             host=redis_config["host"],
             port=redis_config["port"]
         )
+
+    @classmethod
+    def configure_pool(cls, pool_config):
+        """Apply the `redis.pool` section of config.yaml. Only affects pools created afterwards."""
+        cls.pool_settings = {**cls.DEFAULT_POOL_SETTINGS, **(pool_config or {})}
+
+    @classmethod
+    def get_connection_pool(cls, redis_url):
+        with cls._lock:
+            pool = cls._pools.get(redis_url)
+            if pool is None:
+                pool = _TrackedPool.from_url(redis_url, **cls.pool_settings)
+                cls._pools[redis_url] = pool
+            return pool
+
+    @classmethod
+    def get_client(cls, redis_url):
+        """Return a client backed by the shared pool; creating one is cheap."""
+        return redis.Redis(connection_pool=cls.get_connection_pool(redis_url))
+
+    @classmethod
+    def get_async_client(cls, redis_url):
+        """Return an asyncio client backed by the shared async pool. Only valid on the BackgroundLoop."""
+        with cls._lock:
+            pool = cls._async_pools.get(redis_url)
+            if pool is None:
+                pool = _TrackedAsyncPool.from_url(redis_url, **cls.pool_settings)
+                cls._async_pools[redis_url] = pool
+        return redis.asyncio.Redis(connection_pool=pool)
+
+    @classmethod
+    async def run(cls, redis_url, operation):
+        """
+        Await `operation(client)` with an asyncio client, from any event loop. The call
+        runs on the BackgroundLoop, which owns the async pool, so connections are reused
+        across reruns instead of being left open by each rerun's loop.
+        """
+        async def call():
+            return await operation(cls.get_async_client(redis_url))
+        return await BackgroundLoop.run(call())
+
+    @staticmethod
+    def _pool_usage(pool):
+        in_use, idle = pool.usage.snapshot()
+        return {'max_connections': pool.max_connections, 'in_use': in_use, 'idle': idle}
+
+    @classmethod
+    def pool_stats(cls):
+        """Return connection usage of the sync and async pools, per Redis host."""
+        with cls._lock:
+            sync_pools = list(cls._pools.items())
+            async_pools = list(cls._async_pools.items())
+        stats = {}
+        for kind, pools in (("sync", sync_pools), ("async", async_pools)):
+            for url, pool in pools:
+                host = url.rsplit("@", 1)[-1]  # keep credentials out of logs and metrics
+                usage = cls._pool_usage(pool)
+                entry = stats.setdefault(f"{kind}:{host}", {key: 0 for key in usage})
+                for key, value in usage.items():
+                    entry[key] += value
+        for entry in stats.values():
+            entry['saturation'] = round(entry['in_use'] / entry['max_connections'], 3)
+        return stats
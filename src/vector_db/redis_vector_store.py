@@ -0,0 +1,204 @@
+import re
+import uuid
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from redis.commands.search.field import NumericField, TextField, VectorField
+from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
+
+from vector_db.redis_manager import RedisManager
+
+from utils.logger import setup_logging
+logger = setup_logging()
+
+VECTOR_DTYPES = {
+    "FLOAT16": np.float16,
+    "FLOAT32": np.float32,
+    "FLOAT64": np.float64,
+}
+
+
+class RedisVectorStore:
+    """
+    Document index in Redis, written and searched directly through redis-py so
+    that vector encoding, index algorithm and write batching are under our control.
+
+    Documents are stored as hashes under `doc:<index_name>:` with the same field
+    names LangChain's Redis vector store used (content, content_vector, source, page).
+    The content is also indexed as full text, so the same index answers BM25 queries.
+    """
+    CONTENT_FIELD = "content"
+    VECTOR_FIELD = "content_vector"
+    DEFAULT_SETTINGS = {
+        'algorithm': "HNSW",
+        'datatype': "FLOAT32",
+        'distance_metric': "COSINE",
+        'm': 16,
+        'ef_construction': 200,
+        'ef_runtime': 10,
+        'batch_size': 256,
+    }
+
+    def __init__(self, redis_url, index_name, settings=None):
+        self.redis_url = redis_url
+        self.index_name = index_name
+        self.settings = {**self.DEFAULT_SETTINGS, **(settings or {})}
+        self.settings['algorithm'] = self.settings['algorithm'].upper()
+        self.settings['datatype'] = self.settings['datatype'].upper()
+        if self.settings['algorithm'] not in ("HNSW", "FLAT"):
+            raise ValueError(f"Unsupported vector index algorithm: {self.settings['algorithm']}")
+        if self.settings['datatype'] not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector datatype: {self.settings['datatype']}")
+        self.dtype = VECTOR_DTYPES[self.settings['datatype']]
+        self.key_prefix = f"doc:{index_name}"
+        self.client = RedisManager.get_client(redis_url)
+
+    def encode(self, vector):
+        """Pack a vector into the blob format the index was created with."""
+        return np.asarray(vector, dtype=self.dtype).tobytes()
+
+    def create_index(self, dims):
+        vector_attributes = {
+            "TYPE": self.settings['datatype'],
+            "DIM": dims,
+            "DISTANCE_METRIC": self.settings['distance_metric'],
+        }
+        if self.settings['algorithm'] == "HNSW":
+            vector_attributes.update({
+                "M": self.settings['m'],
+                "EF_CONSTRUCTION": self.settings['ef_construction'],
+                "EF_RUNTIME": self.settings['ef_runtime'],
+            })
+        schema = (
+            TextField(self.CONTENT_FIELD),
+            TextField("source"),
+            NumericField("page"),
+            NumericField("start_index"),  # offset of the chunk within its page, used to merge neighbouring hits
+            VectorField(self.VECTOR_FIELD, self.settings['algorithm'], vector_attributes),
+        )
+        definition = IndexDefinition(prefix=[f"{self.key_prefix}:"], index_type=IndexType.HASH)
+        self.client.ft(self.index_name).create_index(schema, definition=definition)
+        logger.info("Created %s index %s (%s x %s)", self.settings['algorithm'], self.index_name, dims, self.settings['datatype'])
+
+    def add_documents(self, documents, vectors):
+        """Write documents and their vectors, one pipelined round trip per `batch_size` hashes."""
+        keys = []
+        batch_size = self.settings['batch_size']
+        pipe = self.client.pipeline(transaction=False)
+        for position, (document, vector) in enumerate(zip(documents, vectors), start=1):
+            key = f"{self.key_prefix}:{uuid.uuid4().hex}"
+            mapping = {**document.metadata, self.CONTENT_FIELD: document.page_content, self.VECTOR_FIELD: self.encode(vector)}
+            pipe.hset(key, mapping=mapping)
+            keys.append(key)
+            if position % batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+        return keys
+
+    def _knn_query(self, k):
+        ef_runtime = f" EF_RUNTIME {self.settings['ef_runtime']}" if self.settings['algorithm'] == "HNSW" else ""
+        return (
+            Query(f"*=>[KNN {k} @{self.VECTOR_FIELD} $vector{ef_runtime} AS vector_distance]")
+            .sort_by("vector_distance")
+            .paging(0, k)
+            .return_fields(self.CONTENT_FIELD, "source", "page", "start_index", "vector_distance")
+            .dialect(2)
+        )
+
+    def _range_query(self, k):
+        # Only hits within $radius (a distance in the index's metric), closest first
+        epsilon = " $EPSILON: 0.01;" if self.settings['algorithm'] == "HNSW" else ""
+        return (
+            Query(f"@{self.VECTOR_FIELD}:[VECTOR_RANGE $radius $vector]=>{{$YIELD_DISTANCE_AS: vector_distance;{epsilon}}}")
+            .sort_by("vector_distance")
+            .paging(0, k)
+            .return_fields(self.CONTENT_FIELD, "source", "page", "start_index", "vector_distance")
+            .dialect(2)
+        )
+
+    def _vector_search_args(self, vector, k, distance_threshold):
+        if distance_threshold is None:
+            return self._knn_query(k), {"vector": self.encode(vector)}
+        return self._range_query(k), {"vector": self.encode(vector), "radius": distance_threshold}
+
+    def _text_query(self, query_text, k):
+        # Any query term may match; BM25 ranks chunks sharing more (and rarer) terms first.
+        # Only word characters are kept, which also strips the query syntax characters.
+        terms = sorted(set(term.lower() for term in re.findall(r"\w+", query_text) if len(term) > 1))
+        if not terms:
+            return None
+        return (
+            Query(f"@{self.CONTENT_FIELD}:({'|'.join(terms)})")
+            .scorer("BM25")
+            .with_scores()
+            .paging(0, k)
+            .return_fields(self.CONTENT_FIELD, "source", "page", "start_index")
+            .dialect(2)
+        )
+
+    def _to_document(self, result):
+        metadata = {
+            "id": result.id,
+            "source": getattr(result, "source", None),
+            "page": int(getattr(result, "page", 0)),
+            "start_index": int(result.start_index) if getattr(result, "start_index", None) is not None else None,
+        }
+        if getattr(result, "vector_distance", None) is not None:
+            metadata["vector_distance"] = float(result.vector_distance)
+        if getattr(result, "score", None) is not None:
+            metadata["text_score"] = float(result.score)
+        return Document(page_content=getattr(result, self.CONTENT_FIELD), metadata=metadata)
+
+    def similarity_search_by_vector(self, vector, k=10, distance_threshold=None):
+        """Return up to `k` nearest chunks, closest first; with a threshold, only those within that distance."""
+        query, params = self._vector_search_args(vector, k, distance_threshold)
+        results = self.client.ft(self.index_name).search(query, query_params=params)
+        return [self._to_document(result) for result in results.docs]
+
+    async def asimilarity_search_by_vector(self, vector, k=10, distance_threshold=None):
+        query, params = self._vector_search_args(vector, k, distance_threshold)
+        results = await RedisManager.run(self.redis_url, lambda client: client.ft(self.index_name).search(query, query_params=params))
+        return [self._to_document(result) for result in results.docs]
+
+    def text_search(self, query_text, k=10):
+        query = self._text_query(query_text, k)
+        if query is None:
+            return []
+        results = self.client.ft(self.index_name).search(query)
+        return [self._to_document(result) for result in results.docs]
+
+    async def atext_search(self, query_text, k=10):
+        query = self._text_query(query_text, k)
+        if query is None:
+            return []
+        results = await RedisManager.run(self.redis_url, lambda client: client.ft(self.index_name).search(query))
+        return [self._to_document(result) for result in results.docs]
+
+
+class RedisVectorRetriever(BaseRetriever):
+    """LangChain retriever over a RedisVectorStore."""
+    store: Any
+    embeddings: Any
+    k: int = 10
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.store.similarity_search_by_vector(self.embeddings.embed_query(query), self.k)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        return await self.store.asimilarity_search_by_vector(vector, self.k)
+
+    async def aget_documents_by_vector(self, vector, k=None, distance_threshold=None):
+        """Retrieve with a precomputed query embedding, so a shared query is only embedded once."""
+        return await self.store.asimilarity_search_by_vector(vector, k or self.k, distance_threshold)
+
+    async def aget_documents_by_text(self, query, k=None):
+        """Retrieve by BM25 full-text match on the chunk content."""
+        return await self.store.atext_search(query, k or self.k)
@@ -0,0 +1,4 @@
+from benchmarks.common import use_app_sources
+
+# The app's modules import each other as top-level packages from src/
+use_app_sources()
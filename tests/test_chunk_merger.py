@@ -0,0 +1,49 @@
+from langchain_core.documents import Document
+
+from chat_management.chunk_merger import ChunkMerger
+
+
+def chunk(text, start, page=1, doc_id=None, distance=None, source="doc.pdf"):
+    metadata = {'source': source, 'page': page, 'start_index': start, 'id': doc_id or f"{page}:{start}"}
+    if distance is not None:
+        metadata['vector_distance'] = distance
+    return Document(page_content=text, metadata=metadata)
+
+
+def test_overlapping_chunks_merge_into_one_span():
+    first = chunk("hello wor", 0, distance=0.3)
+    second = chunk("world again", 6, distance=0.1)
+    [span] = ChunkMerger.merge([second, first])
+    assert span.page_content == "hello world again"
+    assert span.metadata['vector_distance'] == 0.1
+    assert span.metadata['end_index'] == 17
+    assert span.metadata['merged_ids'] == ["1:0", "1:6"]
+
+
+def test_adjacent_chunks_merge_across_the_stripped_whitespace():
+    [span] = ChunkMerger.merge([chunk("hello", 0), chunk("world", 6)])
+    assert span.page_content == "hello world"
+
+
+def test_span_keeps_the_rank_of_its_best_chunk():
+    other_page = chunk("elsewhere", 0, page=2)
+    merged = ChunkMerger.merge([chunk("bbbb", 3), other_page, chunk("aaab", 0)])
+    assert [doc.page_content for doc in merged] == ["aaabbbb", "elsewhere"]
+
+
+def test_distant_chunks_and_other_pages_stay_apart():
+    docs = [chunk("first", 0), chunk("far away", 100), chunk("first", 0, page=2)]
+    assert len(ChunkMerger.merge(docs)) == 3
+
+
+def test_spans_are_capped_at_max_span_chars():
+    docs = [chunk("a" * 10, 0), chunk("b" * 10, 10)]
+    assert len(ChunkMerger.merge(docs, max_span_chars=15)) == 2
+    assert len(ChunkMerger.merge(docs, max_span_chars=20)) == 1
+
+
+def test_chunks_without_offsets_pass_through_in_rank_order():
+    loose = Document(page_content="no offsets", metadata={'id': "x"})
+    merged = ChunkMerger.merge([loose, chunk("ranked second", 0)])
+    assert merged[0] is loose
+    assert merged[1].page_content == "ranked second"
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import pytest
+
+from utils.executors import BoundedExecutor, ExecutorSaturated
+
+
+def blocker():
+    """A task that runs until the returned event is set."""
+    release = threading.Event()
+    return release, lambda: release.wait(5)
+
+
+def test_a_freed_slot_goes_to_the_waiting_caller():
+    executor = BoundedExecutor("test", max_workers=1, max_queued=0, queue_timeout=5)
+    release, task = blocker()
+    running = executor.submit(task)
+    waiter = threading.Thread(target=lambda: executor.call(lambda: None))
+    waiter.start()
+    release.set()
+    waiter.join(5)
+    assert not waiter.is_alive()
+    assert running.result() is True
+    assert executor.stats()['rejected'] == 0
+
+
+def test_submit_is_rejected_after_the_queue_timeout():
+    executor = BoundedExecutor("test", max_workers=1, max_queued=0, queue_timeout=0.05)
+    release, task = blocker()
+    executor.submit(task)
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: None)
+    release.set()
+    assert executor.call(lambda: "ran") == "ran"
+    assert executor.stats()['rejected'] == 1
+
+
+def test_run_waits_for_a_slot_without_blocking_the_event_loop():
+    executor = BoundedExecutor("test", max_workers=1, max_queued=0, queue_timeout=5)
+    release, task = blocker()
+
+    async def main():
+        executor.submit(task)
+        waiting = asyncio.ensure_future(executor.run(lambda: "ran"))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        release.set()  # the loop is free to run this while `waiting` waits for the slot
+        return await waiting
+
+    assert asyncio.run(main()) == "ran"
+
+
+def test_a_cancelled_waiter_does_not_keep_the_slot():
+    executor = BoundedExecutor("test", max_workers=1, max_queued=0, queue_timeout=5)
+    release, task = blocker()
+
+    async def main():
+        executor.submit(task)
+        waiting = asyncio.ensure_future(executor.run(lambda: None))
+        await asyncio.sleep(0.01)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        release.set()
+        return await executor.run(lambda: "ran")
+
+    assert asyncio.run(main()) == "ran"
+    assert executor.stats()['pending'] == 0
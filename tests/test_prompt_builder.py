@@ -0,0 +1,50 @@
+import pytest
+
+from chat_management.prompt_builder import DOCS_HEADER, PromptBuilder
+from model_services.model_config import ModelConfig
+
+
+@pytest.fixture(autouse=True)
+def estimated_token_counts(monkeypatch):
+    # Estimated counts (len // 4 + 1) keep the budgets below independent of tiktoken
+    monkeypatch.setattr(PromptBuilder, "_encoder", False)
+    monkeypatch.setattr(PromptBuilder, "settings", {**PromptBuilder.DEFAULT_SETTINGS, 'min_overlap_chars': 4})
+
+
+def config(uses_rag=True, budget=1000):
+    return ModelConfig(name="test", description="", endpoint="http://localhost/", uses_rag=uses_rag,
+                       id="test", context_token_budget=budget)
+
+
+def test_trim_overlap_drops_text_already_selected():
+    assert PromptBuilder.trim_overlap("quick brown", ["the quick brown fox"]) is None
+
+
+def test_trim_overlap_drops_a_shared_prefix():
+    assert PromptBuilder.trim_overlap("brown fox jumps", ["the quick brown fox"]) == "jumps"
+
+
+def test_trim_overlap_drops_a_shared_suffix():
+    assert PromptBuilder.trim_overlap("a very quick", ["quick brown fox"]) == "a very"
+
+
+def test_build_packs_documents_in_rank_order():
+    assembled = PromptBuilder.build("what?", ["first doc", "second doc"], config())
+    assert assembled.docs == ["first doc", "second doc"]
+    assert assembled.dropped == 0
+    assert assembled.text.index("first doc") < assembled.text.index("second doc")
+    assert "what?" in assembled.text
+
+
+def test_build_skips_documents_over_budget_but_keeps_shorter_ones():
+    long_doc = "x" * 400
+    assembled = PromptBuilder.build("q", ["short one", long_doc, "short two"], config(budget=20))
+    assert assembled.docs == ["short one", "short two"]
+    assert assembled.dropped == 1
+    assert assembled.doc_tokens <= 20
+
+
+def test_build_without_rag_has_no_documents_section():
+    assembled = PromptBuilder.build("q", ["ignored"], config(uses_rag=False))
+    assert DOCS_HEADER not in assembled.text
+    assert assembled.docs == []
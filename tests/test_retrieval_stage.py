@@ -0,0 +1,96 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+from chat_management.retrieval_stage import RetrievalStage
+from model_services.model_config import ModelConfig
+
+
+@pytest.fixture(autouse=True)
+def default_settings(monkeypatch):
+    monkeypatch.setattr(RetrievalStage, "settings", dict(RetrievalStage.DEFAULT_SETTINGS, max_k=8))
+
+
+def hit(doc_id, distance=None):
+    metadata = {'id': doc_id}
+    if distance is not None:
+        metadata['vector_distance'] = distance
+    return Document(page_content=doc_id, metadata=metadata)
+
+
+def config(retrieval_k, distance_threshold=None):
+    return ModelConfig(name="test", description="", endpoint="http://localhost/", uses_rag=True,
+                       id="test", retrieval_k=retrieval_k, distance_threshold=distance_threshold)
+
+
+def test_adaptive_k_cuts_at_the_first_gap():
+    assert RetrievalStage.adaptive_k([0.10, 0.12, 0.40, 0.41], 4) == 2
+
+
+def test_adaptive_k_respects_the_threshold():
+    assert RetrievalStage.adaptive_k([0.10, 0.15, 0.25, 0.30], 4, distance_threshold=0.22) == 2
+
+
+def test_adaptive_k_widens_flat_distances_up_to_max_k():
+    distances = [0.10 + 0.001 * i for i in range(12)]
+    assert RetrievalStage.adaptive_k(distances, 3) == 8
+
+
+def test_adaptive_k_stops_a_widened_count_at_a_gap():
+    distances = [0.10, 0.11, 0.12, 0.13, 0.50, 0.51]
+    assert RetrievalStage.adaptive_k(distances, 3) == 4
+
+
+def test_select_keeps_fused_order_and_full_text_hits():
+    docs = [hit("text-only"), hit("b", 0.12), hit("a", 0.10), hit("far", 0.90)]
+    selected = RetrievalStage.select(docs, 3)
+    assert [doc.metadata['id'] for doc in selected] == ["text-only", "b", "a"]
+
+
+def test_select_drops_hits_beyond_the_threshold():
+    docs = [hit("a", 0.10), hit("b", 0.15), hit("c", 0.60)]
+    assert [doc.metadata['id'] for doc in RetrievalStage.select(docs, 3, distance_threshold=0.5)] == ["a", "b"]
+
+
+def test_fuse_ranks_hits_found_by_both_searches_first():
+    vector = [hit("a", 0.1), hit("b", 0.2)]
+    text = [hit("b"), hit("c")]
+    fused = RetrievalStage.fuse([vector, text], rrf_k=60)
+    assert [doc.metadata['id'] for doc in fused] == ["b", "a", "c"]
+    assert fused[0].metadata['vector_distance'] == 0.2
+    assert fused[0].metadata['fused_score'] > fused[1].metadata['fused_score']
+
+
+def test_fuse_limit():
+    assert len(RetrievalStage.fuse([[hit("a"), hit("b"), hit("c")]], limit=2)) == 2
+
+
+class FakeRetriever:
+    def __init__(self, distances):
+        self.distances = distances
+        self.requested = []
+        self.embeddings = SimpleNamespace(embed_query=lambda query: [0.0])
+
+    async def aget_documents_by_vector(self, query_vector, k, distance_threshold=None):
+        self.requested.append(k)
+        return [hit(str(i), distance) for i, distance in enumerate(self.distances[:k])]
+
+
+def vector_search(retriever, configs):
+    return RetrievalStage(retriever, "query", model_configs=configs).vector_search()
+
+
+def test_vector_search_fetches_the_largest_retrieval_k():
+    retriever = FakeRetriever([0.1 * i for i in range(20)])
+    docs = asyncio.run(vector_search(retriever, [config(3), config(5)]))
+    assert retriever.requested == [5]
+    assert len(docs) == 5
+
+
+def test_vector_search_fetches_up_to_max_k_only_for_flat_hits():
+    retriever = FakeRetriever([0.1 + 0.001 * i for i in range(20)])
+    docs = asyncio.run(vector_search(retriever, [config(5)]))
+    assert retriever.requested == [5, 8]
+    assert len(docs) == 8
@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+
+from chat_management.stream_buffer import StreamBuffer
+
+
+class FakePlaceholder:
+    def __init__(self):
+        self.rendered = []
+
+    def markdown(self, text):
+        self.rendered.append(text)
+
+
+def test_flushes_every_flush_tokens_chunks():
+    placeholder = FakePlaceholder()
+    buffer = StreamBuffer(placeholder, flush_tokens=3, flush_interval_ms=60_000)
+    for chunk in ["a", "b", "c", "d"]:
+        buffer.append(chunk)
+    assert placeholder.rendered == ["abc"]
+    buffer.flush()
+    assert placeholder.rendered == ["abc", "abcd"]
+    assert buffer.text == "abcd"
+    assert (buffer.chunk_count, buffer.flush_count) == (4, 2)
+
+
+def test_flush_without_new_chunks_does_not_render():
+    placeholder = FakePlaceholder()
+    buffer = StreamBuffer(placeholder, flush_tokens=1)
+    buffer.append("a")
+    buffer.flush()
+    assert placeholder.rendered == ["a"]
+
+
+def test_zero_interval_renders_every_chunk():
+    placeholder = FakePlaceholder()
+    buffer = StreamBuffer(placeholder, flush_tokens=100, flush_interval_ms=0)
+    buffer.append("a")
+    buffer.append("b")
+    assert placeholder.rendered == ["a", "ab"]
+
+
+def test_chunk_text_accepts_strings_and_message_chunks():
+    assert StreamBuffer.chunk_text("x") == "x"
+    assert StreamBuffer.chunk_text(SimpleNamespace(content="y")) == "y"
+    assert StreamBuffer.chunk_text(SimpleNamespace(content=None)) == ""
+
+
+def test_empty_chunks_are_ignored():
+    buffer = StreamBuffer(FakePlaceholder(), flush_tokens=1)
+    buffer.append("")
+    buffer.append(SimpleNamespace(content=""))
+    assert buffer.chunk_count == 0
+    assert buffer.text == ""